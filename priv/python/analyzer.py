@@ -5,7 +5,7 @@ Audio Analyzer - Librosa-based Feature Extraction
 @description Extracts audio features using librosa for Sound Forge Alchemy
 @features tempo, key, energy, spectral, mfcc, chroma, structure, loop_points, arrangement, energy_curve
 @author Sound Forge Alchemy Team
-@version 2.0.0
+@version 2.1.0
 @license MIT
 """
 
@@ -14,14 +14,47 @@ import json
 import argparse
 import os
 import warnings
-from typing import Dict, List, Any, Optional, Tuple
+import contextlib
+import functools
+import hashlib
+import heapq
+import importlib.metadata
+import importlib.util
+import struct
+import tempfile
+import concurrent.futures
+import multiprocessing
+import operator
+from typing import Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 
 # Suppress librosa warnings
 warnings.filterwarnings('ignore')
 
+# Persist numba's compiled code (librosa's beat/onset helpers and our own
+# kernels) across invocations; must be set before librosa is imported. The
+# temp dir is used because the release runs as a user without a home dir.
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'sfa-numba'))
+
+def _lazy_module(name: str) -> Any:
+    """Import ``name`` on first attribute access (importlib's LazyLoader)."""
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 try:
-    import librosa
     import numpy as np
+    # librosa and the scipy/numba stack behind it dominate startup, so it is
+    # only loaded when an extractor first touches it: --help, argument errors,
+    # missing files and cache hits exit without paying for it. analyze_audio
+    # touches it on the main thread before any worker threads start.
+    librosa = _lazy_module('librosa')
 except ImportError as e:
     print(json.dumps({
         "error": "Missing dependencies",
@@ -30,141 +63,313 @@ except ImportError as e:
     }), file=sys.stderr)
     sys.exit(1)
 
-# Optional scipy for checkerboard kernel novelty
+# Optional soundfile for fast float32 decoding (librosa.load is the fallback)
+try:
+    import soundfile as sf
+    HAS_SOUNDFILE = True
+except ImportError:
+    HAS_SOUNDFILE = False
+
+# Optional numba to fuse framewise loops. librosa depends on it, but it
+# costs ~0.5s to import and feature sets such as key/spectral never touch
+# it, so kernels compile (and import numba) on first call instead.
+HAS_NUMBA = importlib.util.find_spec('numba') is not None
+prange = range  # rebound to numba.prange before the first kernel compiles
+
+
+def njit(**options):
+    """Lazy numba.njit: compile on first call, run as plain Python without numba."""
+    def decorate(fn):
+        compiled = None
+
+        @functools.wraps(fn)
+        def dispatch(*args):
+            nonlocal compiled
+            if compiled is None:
+                if HAS_NUMBA:
+                    import numba
+                    globals()['prange'] = numba.prange
+                    compiled = numba.njit(**options)(fn)
+                else:
+                    compiled = fn
+            return compiled(*args)
+        return dispatch
+    return decorate
+
+# Optional orjson: serialises NumPy arrays/scalars natively and much faster
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Optional threadpoolctl to stop BLAS oversubscription under the thread pool
 try:
-    from scipy.signal import convolve2d
-    HAS_SCIPY = True
+    from threadpoolctl import threadpool_limits
+    HAS_THREADPOOLCTL = True
 except ImportError:
-    HAS_SCIPY = False
+    HAS_THREADPOOLCTL = False
+
+# Bumped when extractor output changes; also part of the result cache key
+ANALYSIS_VERSION = "2.1.0"
+
+
+PITCH_CLASSES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+
+
+def _build_key_profiles() -> np.ndarray:
+    """Build the (24, 12) Krumhansl-Schmuckler key template matrix.
+
+    Rows 0-11 are the Krumhansl-Kessler major profile rotated to each tonic
+    (C..B), rows 12-23 the minor profile. Each row is mean-centred and unit
+    normalised, so ``K @ z`` for a centred, unit-norm chroma vector ``z``
+    gives the Pearson correlation against all 24 keys in one GEMV.
+    """
+    major = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+    minor = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+    rows = []
+    for profile in (major, minor):
+        centred = profile - profile.mean()
+        centred /= np.linalg.norm(centred)
+        rows.extend(np.roll(centred, k) for k in range(12))
+    return np.vstack(rows).astype(np.float32)
+
+
+_KEY_PROFILES = _build_key_profiles()
+
+# Binary diatonic scale templates for windowed key-change detection, rows
+# interleaved (C major, C minor, C# major, ...) so argmax tie-breaks in
+# tonic order, major first
+_SCALE_PROFILES = np.vstack([
+    np.roll(profile, k)
+    for k in range(12)
+    for profile in (
+        np.array([1, 0, 1, 0, 1, 1, 0, 1, 0, 1, 0, 1], dtype=np.float32),
+        np.array([1, 0, 1, 1, 0, 1, 0, 1, 1, 0, 1, 0], dtype=np.float32),
+    )
+])
 
 
 # ---------------------------------------------------------------------------
 # Existing feature extractors
 # ---------------------------------------------------------------------------
 
-def extract_tempo(y: np.ndarray, sr: int) -> Dict[str, Any]:
+def extract_tempo(
+    y: np.ndarray,
+    sr: int,
+    hop_length: int = 512,
+    onset_envelope: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
     """
     Extract tempo (BPM) from audio
 
     Args:
         y: Audio time series
         sr: Sample rate
+        hop_length: Onset envelope hop (larger is faster, coarser beat times)
+        onset_envelope: Optional precomputed onset strength at ``hop_length``
+            (shared with detect_transients)
 
     Returns:
         Dictionary containing tempo information
     """
-    tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-    beat_times = librosa.frames_to_time(beats, sr=sr)
+    if onset_envelope is None:
+        onset_envelope = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+    tempo, beats = librosa.beat.beat_track(onset_envelope=onset_envelope, sr=sr, hop_length=hop_length)
+    beat_times = librosa.frames_to_time(beats, sr=sr, hop_length=hop_length)
 
     return {
         "tempo": float(tempo),
-        "beats": beat_times.tolist(),
+        "beats": beat_times,
         "beat_count": len(beats)
     }
 
 
-def extract_key(y: np.ndarray, sr: int) -> Dict[str, Any]:
+def extract_key(
+    y: np.ndarray,
+    sr: int,
+    S: Optional[np.ndarray] = None,
+    chromagram: Optional[np.ndarray] = None,
+    tuning: Optional[float] = None
+) -> Dict[str, Any]:
     """
     Extract musical key from audio using chroma features
 
     Args:
         y: Audio time series
         sr: Sample rate
+        S: Optional precomputed magnitude spectrogram |STFT(y)|
+        chromagram: Optional precomputed STFT chromagram (shared with extract_chroma)
+        tuning: Tuning offset in bins; None estimates it from the spectrogram
 
     Returns:
         Dictionary containing key information
     """
     # Compute chroma features
-    chromagram = librosa.feature.chroma_stft(y=y, sr=sr)
+    if chromagram is None:
+        if S is None:
+            S = np.abs(librosa.stft(y))
+        chromagram = librosa.feature.chroma_stft(S=S ** 2, sr=sr, tuning=tuning)
 
     # Average chroma across time
     chroma_mean = np.mean(chromagram, axis=1)
 
-    # Find dominant pitch class
-    dominant_pitch_class = np.argmax(chroma_mean)
-
-    # Map to key names
-    pitch_classes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
-
-    # Simple major/minor detection using chroma profile
-    major_profile = np.array([1, 0, 1, 0, 1, 1, 0, 1, 0, 1, 0, 1])
-    minor_profile = np.array([1, 0, 1, 1, 0, 1, 0, 1, 1, 0, 1, 0])
-
-    # Rotate profiles to match dominant pitch class
-    major_correlation = np.correlate(np.roll(major_profile, dominant_pitch_class), chroma_mean)[0]
-    minor_correlation = np.correlate(np.roll(minor_profile, dominant_pitch_class), chroma_mean)[0]
+    # Krumhansl-Schmuckler: correlate against all 24 key profiles at once and
+    # pick tonic + mode jointly (the tonic need not be the loudest bin)
+    centred = chroma_mean - np.mean(chroma_mean)
+    norm = np.linalg.norm(centred)
+    scores = _KEY_PROFILES @ (centred / norm) if norm > 0 else np.zeros(24, dtype=np.float32)
+    best = int(np.argmax(scores))
 
-    mode = "major" if major_correlation > minor_correlation else "minor"
-    key = f"{pitch_classes[dominant_pitch_class]} {mode}"
+    tonic = best % 12
+    mode = "major" if best < 12 else "minor"
+    key = f"{PITCH_CLASSES[tonic]} {mode}"
 
     return {
         "key": key,
-        "confidence": float(max(major_correlation, minor_correlation) / np.sum(chroma_mean)),
-        "pitch_class": pitch_classes[dominant_pitch_class],
+        "confidence": float(max(0.0, scores[best])),
+        "pitch_class": PITCH_CLASSES[tonic],
         "mode": mode
     }
 
 
-def extract_energy(y: np.ndarray, sr: int) -> Dict[str, Any]:
+@njit(parallel=True, cache=True, fastmath=True)
+def _framewise_rms_zcr(
+    y: np.ndarray, frame_length: int, hop_length: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame RMS and zero-crossing rate in one sweep over ``y``.
+
+    Matches librosa.feature.rms / zero_crossing_rate with center=True:
+    RMS frames are zero-padded, ZCR frames edge-padded, and samples with
+    magnitude <= 1e-10 count as zero for crossing detection.
+    """
+    n = y.shape[0]
+    half = frame_length // 2
+    n_frames = 1 + n // hop_length
+    rms = np.empty(n_frames, dtype=np.float32)
+    zcr = np.empty(n_frames, dtype=np.float32)
+    for f in prange(n_frames):
+        start = f * hop_length - half
+        power = 0.0
+        crossings = 0
+        prev_neg = False
+        for i in range(frame_length):
+            idx = start + i
+            if 0 <= idx < n:
+                power += y[idx] * y[idx]
+            v = y[min(max(idx, 0), n - 1)]
+            neg = v < -1e-10
+            if i > 0 and neg != prev_neg:
+                crossings += 1
+            prev_neg = neg
+        rms[f] = np.sqrt(power / frame_length)
+        zcr[f] = crossings / frame_length
+    return rms, zcr
+
+
+def extract_energy(y: np.ndarray, sr: int, hop_length: int = 512) -> Dict[str, Any]:
     """
     Extract energy features from audio
 
     Args:
         y: Audio time series
         sr: Sample rate
+        hop_length: Frame hop for RMS / zero crossing rate
 
     Returns:
         Dictionary containing energy information
     """
-    # RMS energy
-    rms = librosa.feature.rms(y=y)[0]
-
-    # Zero crossing rate (proxy for noisiness)
-    zcr = librosa.feature.zero_crossing_rate(y)[0]
+    if HAS_NUMBA and len(y) > 0:
+        # RMS energy and zero crossing rate (proxy for noisiness) in one pass
+        rms, zcr = _framewise_rms_zcr(y, 2048, hop_length)
+    else:
+        rms = librosa.feature.rms(y=y, hop_length=hop_length)[0]
+        zcr = librosa.feature.zero_crossing_rate(y, hop_length=hop_length)[0]
 
     return {
-        "energy": float(np.mean(rms)),
-        "energy_variance": float(np.var(rms)),
-        "energy_max": float(np.max(rms)),
-        "energy_min": float(np.min(rms)),
-        "zero_crossing_rate": float(np.mean(zcr))
+        "energy": np.mean(rms),
+        "energy_variance": np.var(rms),
+        "energy_max": np.max(rms),
+        "energy_min": np.min(rms),
+        "zero_crossing_rate": np.mean(zcr)
     }
 
 
-def extract_spectral(y: np.ndarray, sr: int) -> Dict[str, Any]:
+@njit(cache=True, fastmath=True)
+def _row_mean_var(M: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-row mean and population variance in a single Welford sweep."""
+    n_rows, n_cols = M.shape
+    mean = np.zeros(n_rows)
+    var = np.zeros(n_rows)
+    for i in range(n_rows):
+        mu = 0.0
+        m2 = 0.0
+        for t in range(n_cols):
+            x = M[i, t]
+            d = x - mu
+            mu += d / (t + 1)
+            m2 += d * (x - mu)
+        mean[i] = mu
+        var[i] = m2 / n_cols if n_cols > 0 else 0.0
+    return mean, var
+
+
+def mean_var(M: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise float32 (mean, variance) of a 2-D feature matrix.
+
+    One pass through memory with numba; NumPy's two reductions otherwise.
+    """
+    if HAS_NUMBA:
+        mean, var = _row_mean_var(np.ascontiguousarray(M))
+        return mean.astype(np.float32), var.astype(np.float32)
+    return M.mean(axis=1, dtype=np.float32), M.var(axis=1, dtype=np.float32)
+
+
+def extract_spectral(y: np.ndarray, sr: int, S: Optional[np.ndarray] = None) -> Dict[str, Any]:
     """
     Extract spectral features from audio
 
     Args:
         y: Audio time series
         sr: Sample rate
+        S: Optional precomputed magnitude spectrogram |STFT(y)|
 
     Returns:
         Dictionary containing spectral information
     """
+    if S is None:
+        S = np.abs(librosa.stft(y))
+
     # Spectral centroid
-    spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
+    centroid = librosa.feature.spectral_centroid(S=S, sr=sr)
+    centroid_mean, centroid_var = mean_var(centroid)
 
     # Spectral rolloff
-    spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
+    spectral_rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0]
 
-    # Spectral bandwidth
-    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
+    # Spectral bandwidth (reuses the centroid rather than recomputing it)
+    spectral_bandwidth = librosa.feature.spectral_bandwidth(S=S, sr=sr, centroid=centroid)[0]
 
     # Spectral contrast
-    spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
+    spectral_contrast = librosa.feature.spectral_contrast(S=S, sr=sr)
 
     return {
-        "spectral_centroid": float(np.mean(spectral_centroids)),
-        "spectral_centroid_variance": float(np.var(spectral_centroids)),
-        "spectral_rolloff": float(np.mean(spectral_rolloff)),
-        "spectral_bandwidth": float(np.mean(spectral_bandwidth)),
-        "spectral_contrast": np.mean(spectral_contrast, axis=1).tolist(),
-        "spectral_flatness": float(np.mean(librosa.feature.spectral_flatness(y=y)[0]))
+        "spectral_centroid": centroid_mean[0],
+        "spectral_centroid_variance": centroid_var[0],
+        "spectral_rolloff": np.mean(spectral_rolloff),
+        "spectral_bandwidth": np.mean(spectral_bandwidth),
+        "spectral_contrast": spectral_contrast.mean(axis=1, dtype=np.float32),
+        "spectral_flatness": np.mean(librosa.feature.spectral_flatness(S=S)[0])
     }
 
 
-def extract_mfcc(y: np.ndarray, sr: int, n_mfcc: int = 13) -> Dict[str, Any]:
+def extract_mfcc(
+    y: np.ndarray,
+    sr: int,
+    n_mfcc: int = 13,
+    S: Optional[np.ndarray] = None,
+    power: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
     """
     Extract MFCC (Mel-frequency cepstral coefficients) features
 
@@ -172,40 +377,267 @@ def extract_mfcc(y: np.ndarray, sr: int, n_mfcc: int = 13) -> Dict[str, Any]:
         y: Audio time series
         sr: Sample rate
         n_mfcc: Number of MFCCs to extract
+        S: Optional precomputed magnitude spectrogram |STFT(y)|
+        power: Optional precomputed power spectrogram |STFT(y)|**2; used
+            instead of squaring ``S`` again
 
     Returns:
         Dictionary containing MFCC information
     """
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)
+    if power is None:
+        if S is None:
+            S = np.abs(librosa.stft(y))
+        power = S ** 2
+
+    melspec = librosa.feature.melspectrogram(S=power, sr=sr)
+    mfccs = librosa.feature.mfcc(S=librosa.power_to_db(melspec), n_mfcc=n_mfcc)
+    mfcc_mean, mfcc_var = mean_var(mfccs)
 
     return {
-        "mfcc": np.mean(mfccs, axis=1).tolist(),
-        "mfcc_variance": np.var(mfccs, axis=1).tolist(),
+        "mfcc": mfcc_mean,
+        "mfcc_variance": mfcc_var,
         "n_mfcc": n_mfcc
     }
 
 
-def extract_chroma(y: np.ndarray, sr: int) -> Dict[str, Any]:
+# ---------------------------------------------------------------------------
+# Optional GPU (torch/torchaudio) path for the STFT and MFCC
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def resolve_device(device: str) -> str:
+    """Map a --device choice to 'cuda' or 'cpu'.
+
+    torch is imported lazily (it is slow to import and only present when
+    demucs is installed), and 'auto' skips the import entirely on hosts
+    without an NVIDIA driver. 'auto' and 'cuda' fall back to 'cpu' when
+    torch, torchaudio or a CUDA device is unavailable.
+    """
+    if device == 'cpu':
+        return 'cpu'
+    if device == 'auto' and not os.path.exists('/proc/driver/nvidia/version'):
+        return 'cpu'
+    try:
+        import torch
+        import torchaudio  # noqa: F401
+    except ImportError:
+        return 'cpu'
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+
+def stft_magnitude_torch(y: np.ndarray, hop_length: int = 512, device: str = 'cuda', n_fft: int = 2048):
+    """|STFT(y)| computed on ``device``, matching librosa.stft's defaults.
+
+    Returns:
+        (1 + n_fft // 2, n_frames) float32 torch tensor, left on the device.
+    """
+    import torch
+
+    y_t = torch.from_numpy(y).to(device)
+    window = torch.hann_window(n_fft, device=device)
+    D = torch.stft(
+        y_t, n_fft=n_fft, hop_length=hop_length, window=window,
+        center=True, pad_mode='constant', return_complex=True
+    )
+    return D.abs()
+
+
+def extract_mfcc_torch(S, sr: int, n_mfcc: int = 13, n_mels: int = 128) -> Dict[str, Any]:
+    """GPU twin of extract_mfcc for a magnitude spectrogram tensor.
+
+    Mirrors librosa's chain (Slaney mel filterbank on the power spectrum,
+    power_to_db with top_db=80, orthonormal DCT-II) so results agree with
+    the CPU path to float32 precision.
+    """
+    import torch
+    import torchaudio
+
+    power = S ** 2
+    fb = torchaudio.functional.melscale_fbanks(
+        power.shape[0], 0.0, sr / 2.0, n_mels, sr, norm='slaney', mel_scale='slaney'
+    ).to(power.device)
+    db = 10.0 * torch.log10(torch.clamp(fb.T @ power, min=1e-10))
+    db = torch.maximum(db, db.max() - 80.0)
+    dct = torchaudio.functional.create_dct(n_mfcc, n_mels, norm='ortho').to(power.device)
+    mfccs = dct.T @ db
+
+    return {
+        "mfcc": mfccs.mean(dim=1).cpu().numpy(),
+        "mfcc_variance": mfccs.var(dim=1, unbiased=False).cpu().numpy(),
+        "n_mfcc": n_mfcc
+    }
+
+
+CHROMA_VARIANTS = ('stft', 'cqt', 'cens')
+CHROMA_CQT_BINS_PER_OCTAVE = 36  # librosa's chroma_cqt/chroma_cens default
+
+
+def cqt_magnitude(
+    y: np.ndarray,
+    sr: int,
+    hop_length: int = 512,
+    tuning: Optional[float] = None
+) -> np.ndarray:
+    """|CQT(y)| with the geometry chroma_cqt/chroma_cens use by default.
+
+    Seven octaves from C1 at CHROMA_CQT_BINS_PER_OCTAVE bins per octave, so
+    the result can be passed as ``C=`` to either without changing output.
+    ``tuning`` is in semitone bins, as for chroma_stft; librosa.cqt reads it
+    in its own (1/36 octave) bins, so it is rescaled and wrapped to match
+    what the CQT's own estimate would give.
+    """
+    if tuning is not None:
+        tuning = tuning * CHROMA_CQT_BINS_PER_OCTAVE / 12
+        tuning = (tuning + 0.5) % 1.0 - 0.5
+    return np.abs(librosa.cqt(
+        y=y, sr=sr, hop_length=hop_length, fmin=librosa.note_to_hz('C1'),
+        n_bins=7 * CHROMA_CQT_BINS_PER_OCTAVE,
+        bins_per_octave=CHROMA_CQT_BINS_PER_OCTAVE, tuning=tuning
+    ))
+
+
+def extract_chroma(
+    y: np.ndarray,
+    sr: int,
+    S: Optional[np.ndarray] = None,
+    chromagram: Optional[np.ndarray] = None,
+    variants: Tuple[str, ...] = ('stft',),
+    tuning: Optional[float] = None,
+    C: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
     """
     Extract chroma features from audio
 
     Args:
         y: Audio time series
         sr: Sample rate
+        S: Optional precomputed magnitude spectrogram |STFT(y)|
+        chromagram: Optional precomputed STFT chromagram (shared with extract_key)
+        variants: Chroma families to compute, any of CHROMA_VARIANTS. CQT and
+            CENS are an order of magnitude slower than STFT, so they are opt-in.
+        tuning: Tuning offset in semitone bins (as for chroma_stft); None
+            lets each variant estimate its own
+        C: Optional precomputed chroma CQT magnitude (see cqt_magnitude),
+            shared by the CQT and CENS variants
 
     Returns:
         Dictionary containing chroma information
     """
-    # Compute chroma features
-    chroma_stft = librosa.feature.chroma_stft(y=y, sr=sr)
-    chroma_cqt = librosa.feature.chroma_cqt(y=y, sr=sr)
-    chroma_cens = librosa.feature.chroma_cens(y=y, sr=sr)
+    result: Dict[str, Any] = {}
 
-    return {
-        "chroma_stft": np.mean(chroma_stft, axis=1).tolist(),
-        "chroma_cqt": np.mean(chroma_cqt, axis=1).tolist(),
-        "chroma_cens": np.mean(chroma_cens, axis=1).tolist()
-    }
+    if 'stft' in variants:
+        if chromagram is None:
+            if S is None:
+                S = np.abs(librosa.stft(y))
+            chromagram = librosa.feature.chroma_stft(S=S ** 2, sr=sr, tuning=tuning)
+        result["chroma_stft"] = chromagram.mean(axis=1, dtype=np.float32)
+
+    # CQT and CENS fold the same constant-Q transform; compute it once
+    if C is None and ('cqt' in variants or 'cens' in variants):
+        C = cqt_magnitude(y, sr, tuning=tuning)
+
+    if 'cqt' in variants:
+        chroma_cqt = librosa.feature.chroma_cqt(C=C, sr=sr, bins_per_octave=CHROMA_CQT_BINS_PER_OCTAVE)
+        result["chroma_cqt"] = chroma_cqt.mean(axis=1, dtype=np.float32)
+
+    if 'cens' in variants:
+        chroma_cens = librosa.feature.chroma_cens(C=C, sr=sr, bins_per_octave=CHROMA_CQT_BINS_PER_OCTAVE)
+        result["chroma_cens"] = chroma_cens.mean(axis=1, dtype=np.float32)
+
+    return result
+
+
+def parse_chroma_variants(features: List[str]) -> Tuple[str, ...]:
+    """Resolve which chroma families the requested features ask for.
+
+    ``chroma`` alone means STFT chroma only; ``chroma:cqt`` / ``chroma:cens``
+    (or ``chroma:stft+cqt``) select variants explicitly; ``all`` computes
+    every variant.
+
+    Returns:
+        Variants in CHROMA_VARIANTS order (empty if chroma was not requested).
+    """
+    if 'all' in features:
+        return CHROMA_VARIANTS
+    requested = set()
+    for feature in features:
+        name, _, spec = feature.partition(':')
+        if name != 'chroma':
+            continue
+        requested.update(spec.split('+') if spec else ['stft'])
+    return tuple(v for v in CHROMA_VARIANTS if v in requested)
+
+
+# ---------------------------------------------------------------------------
+# Shared analysis context
+# ---------------------------------------------------------------------------
+
+class AnalysisContext:
+    """Per-track signal plus lazily computed, memoised whole-track features.
+
+    Structure, loop points and arrangement markers all frame the same
+    waveform; passing one context between them means each chroma/RMS/centroid
+    matrix and the beat grid are computed once per hop, however many stages
+    read them. Entries are published with a single dict store, so threads
+    sharing a context at worst compute the same entry twice.
+
+    ``beat_times`` may be assigned after construction, as long as that
+    happens before ``time_signature`` / ``bar_times`` are first read.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, beat_times: Optional[np.ndarray] = None) -> None:
+        self.y = y
+        self.sr = sr
+        self.beat_times = np.asarray(beat_times if beat_times is not None else [], dtype=float)
+        self._cache: Dict[Tuple[Any, ...], Any] = {}
+
+    def _memo(self, key: Tuple[Any, ...], compute: Callable[[], Any]) -> Any:
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def chroma_cqt(self, hop_length: int) -> np.ndarray:
+        """Whole-track chroma CQT, shape (12, T)."""
+        return self._memo(('chroma_cqt', hop_length), lambda: librosa.feature.chroma_cqt(
+            y=self.y, sr=self.sr, hop_length=hop_length))
+
+    def chroma_stft(self, hop_length: int) -> np.ndarray:
+        """Whole-track STFT chroma, shape (12, T); the window spans the hop."""
+        n_fft = max(2048, hop_length)
+        return self._memo(('chroma_stft', hop_length), lambda: librosa.feature.chroma_stft(
+            y=self.y, sr=self.sr, n_fft=n_fft, hop_length=hop_length))
+
+    def rms(self, hop_length: int, frame_length: int = 2048) -> np.ndarray:
+        """Whole-track framewise RMS, shape (T,), from the shared prefix sums (see _framed_rms)."""
+        return self._memo(('rms', hop_length, frame_length), lambda: _framed_rms(
+            self.y, hop_length, frame_length, energy=self.energy()))
+
+    def spectral_centroid(self, hop_length: int, n_fft: int = 2048) -> np.ndarray:
+        """Whole-track spectral centroid, shape (T,)."""
+        return self._memo(('centroid', hop_length, n_fft), lambda: librosa.feature.spectral_centroid(
+            y=self.y, sr=self.sr, n_fft=n_fft, hop_length=hop_length)[0])
+
+    def spectral_bandwidth(self, hop_length: int, n_fft: int = 2048) -> np.ndarray:
+        """Whole-track spectral bandwidth, shape (T,)."""
+        return self._memo(('bandwidth', hop_length, n_fft), lambda: librosa.feature.spectral_bandwidth(
+            y=self.y, sr=self.sr, n_fft=n_fft, hop_length=hop_length)[0])
+
+    def energy(self) -> np.ndarray:
+        """Prefix sums of y**2 (see _cumulative_energy)."""
+        return self._memo(('energy',), lambda: _cumulative_energy(self.y))
+
+    def block_rms(self, hop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """RMS over non-overlapping ``hop``-sample blocks (see _block_rms)."""
+        return self._memo(('block_rms', hop), lambda: _block_rms(self.y, self.sr, hop, energy=self.energy()))
+
+    @property
+    def time_signature(self) -> Dict[str, Any]:
+        return self._memo(('time_signature',), lambda: _detect_time_signature(self.beat_times))
+
+    @property
+    def bar_times(self) -> np.ndarray:
+        return self._memo(('bar_times',), lambda: compute_bar_grid(
+            self.beat_times, self.time_signature["beats_per_bar"]))
 
 
 # ---------------------------------------------------------------------------
@@ -252,13 +684,14 @@ def _detect_time_signature(beat_times: np.ndarray) -> Dict[str, Any]:
     if len(intervals) < 6:
         return {"beats_per_bar": 4, "confidence": 0.5}
 
-    # Normalised autocorrelation at lags 3 and 4
-    norm = np.correlate(intervals, intervals, mode='full')
-    mid = len(norm) // 2
-    ac0 = norm[mid] if norm[mid] > 0 else 1.0
+    # Normalised autocorrelation at lags 3 and 4 (direct lag products; only
+    # these lags are needed, not the full O(N^2) correlation)
+    ac0 = float(intervals @ intervals)
+    if ac0 <= 0:
+        ac0 = 1.0
 
-    ac3 = norm[mid + 3] / ac0 if mid + 3 < len(norm) else 0.0
-    ac4 = norm[mid + 4] / ac0 if mid + 4 < len(norm) else 0.0
+    ac3 = float(intervals[:-3] @ intervals[3:]) / ac0
+    ac4 = float(intervals[:-4] @ intervals[4:]) / ac0
 
     if ac3 > ac4 * 1.15:
         return {"beats_per_bar": 3, "confidence": float(min(1.0, ac3))}
@@ -266,22 +699,40 @@ def _detect_time_signature(beat_times: np.ndarray) -> Dict[str, Any]:
         return {"beats_per_bar": 4, "confidence": float(min(1.0, ac4))}
 
 
-def _compute_segment_energy(y: np.ndarray, sr: int, start: float, end: float) -> float:
-    """Compute mean RMS energy for a time range."""
+def _compute_segment_energy(
+    y: np.ndarray,
+    sr: int,
+    start: float,
+    end: float,
+    rms: Optional[np.ndarray] = None,
+    hop_length: int = 512
+) -> float:
+    """Compute mean RMS energy for a time range.
+
+    When a whole-track RMS curve (at ``hop_length``) is given, the range is
+    sliced out of it instead of re-framing the segment.
+    """
     s_start = int(start * sr)
     s_end = min(int(end * sr), len(y))
     if s_end <= s_start:
         return 0.0
-    seg = y[s_start:s_end]
-    rms = librosa.feature.rms(y=seg)[0]
-    return float(np.mean(rms)) if len(rms) > 0 else 0.0
+    if rms is not None:
+        f0 = s_start // hop_length
+        f1 = max(f0 + 1, s_end // hop_length)
+        seg_rms = rms[f0:f1]
+    else:
+        seg_rms = librosa.feature.rms(y=y[s_start:s_end])[0]
+    return float(np.mean(seg_rms)) if len(seg_rms) > 0 else 0.0
 
 
 def classify_segments(
     boundaries: np.ndarray,
     y: np.ndarray,
     sr: int,
-    rec_matrix: Optional[np.ndarray] = None
+    rec_matrix: Optional[np.ndarray] = None,
+    chroma: Optional[np.ndarray] = None,
+    hop_length: int = 4096,
+    ctx: Optional[AnalysisContext] = None
 ) -> List[Dict[str, Any]]:
     """Classify segment boundaries into section types using energy heuristics.
 
@@ -290,6 +741,10 @@ def classify_segments(
         y: Audio time series.
         sr: Sample rate.
         rec_matrix: Optional recurrence/self-similarity matrix for repetition grouping.
+        chroma: Optional whole-track chroma at ``hop_length`` (as computed by
+            extract_structure); segment fingerprints are sliced from it.
+        hop_length: Hop of ``chroma`` in samples.
+        ctx: Optional shared context to take the RMS/chroma curves from.
 
     Returns:
         List of segment dictionaries.
@@ -298,10 +753,11 @@ def classify_segments(
     if n_seg <= 0:
         return []
 
-    # Pre-compute per-segment energy
+    # Pre-compute per-segment energy from one whole-track RMS curve
+    rms = ctx.rms(512) if ctx is not None else librosa.feature.rms(y=y)[0]
     energies = []
     for i in range(n_seg):
-        energies.append(_compute_segment_energy(y, sr, boundaries[i], boundaries[i + 1]))
+        energies.append(_compute_segment_energy(y, sr, boundaries[i], boundaries[i + 1], rms=rms))
     energies = np.array(energies)
 
     mean_energy = float(np.mean(energies)) if len(energies) > 0 else 0.0
@@ -310,56 +766,54 @@ def classify_segments(
         max_energy = 1.0
 
     # Repetition groups via simple chroma fingerprint similarity
-    # Build a chroma centroid per segment and group by cosine similarity
+    # Build a chroma centroid per segment (sliced from one whole-track chromagram)
+    # and group by cosine similarity
+    if chroma is None:
+        if ctx is None:
+            ctx = AnalysisContext(y, sr)
+        chroma = ctx.chroma_stft(hop_length)
     seg_chromas = []
     for i in range(n_seg):
         s_start = int(boundaries[i] * sr)
         s_end = min(int(boundaries[i + 1] * sr), len(y))
-        if s_end - s_start < sr // 4:
-            seg_chromas.append(np.zeros(12))
+        f0 = s_start // hop_length
+        f1 = min(s_end // hop_length + 1, chroma.shape[1])
+        if s_end - s_start < sr // 4 or f1 <= f0:
+            seg_chromas.append(np.zeros(12, dtype=chroma.dtype))
         else:
-            c = librosa.feature.chroma_cqt(y=y[s_start:s_end], sr=sr, hop_length=4096)
-            seg_chromas.append(np.mean(c, axis=1))
+            seg_chromas.append(np.mean(chroma[:, f0:f1], axis=1))
     seg_chromas = np.array(seg_chromas)
 
-    # Assign repetition groups via greedy clustering (cosine > 0.85 threshold)
-    groups: List[int] = [-1] * n_seg
-    next_group = 0
-    for i in range(n_seg):
-        if groups[i] >= 0:
-            continue
-        groups[i] = next_group
-        norm_i = np.linalg.norm(seg_chromas[i])
-        if norm_i == 0:
-            next_group += 1
-            continue
-        for j in range(i + 1, n_seg):
-            if groups[j] >= 0:
-                continue
-            norm_j = np.linalg.norm(seg_chromas[j])
-            if norm_j == 0:
-                continue
-            cos_sim = float(np.dot(seg_chromas[i], seg_chromas[j]) / (norm_i * norm_j))
-            if cos_sim > 0.85:
-                groups[j] = next_group
-        next_group += 1
-
-    # Count how often each group appears
-    from collections import Counter
-    group_counts = Counter(groups)
+    # Assign repetition groups as connected components of the cosine > 0.85
+    # graph, so similarity is transitive (A~B, B~C puts A and C together).
+    # All pairwise similarities come from one matmul of the L2-normalised
+    # fingerprints; silent segments (zero norm) never match anything.
+    from scipy.sparse.csgraph import connected_components
+    norms = np.linalg.norm(seg_chromas, axis=1, keepdims=True)
+    unit = np.divide(seg_chromas, norms, out=np.zeros_like(seg_chromas), where=norms > 0)
+    similar = (unit @ unit.T) > 0.85
+    # Labels are numbered in order of each group's first segment
+    _, labels = connected_components(similar, directed=False)
+    groups: List[int] = labels.tolist()
+
+    # Count how often each group appears, then look up each segment's count
+    counts = np.bincount(labels)
+    max_count = int(counts.max())
+    group_sizes: List[int] = counts[labels].tolist()
 
     segments: List[Dict[str, Any]] = []
     for i in range(n_seg):
         e_norm = energies[i] / max_energy
+        group_size = group_sizes[i]
 
         # Determine section type
         if i == 0:
             section_type = "intro"
         elif i == n_seg - 1:
             section_type = "outro"
-        elif group_counts[groups[i]] >= 2 and e_norm > 0.65:
+        elif group_size >= 2 and e_norm > 0.65:
             section_type = "chorus"
-        elif group_counts[groups[i]] >= 2 and e_norm > 0.8:
+        elif group_size >= 2 and e_norm > 0.8:
             section_type = "drop"
         elif e_norm < 0.4:
             section_type = "verse"
@@ -377,7 +831,7 @@ def classify_segments(
                 section_type = "verse"
 
         label = f"{section_type}_{i + 1}"
-        confidence = min(1.0, 0.5 + 0.3 * (group_counts[groups[i]] / max(group_counts.values())) + 0.2 * e_norm)
+        confidence = min(1.0, 0.5 + 0.3 * (group_size / max_count) + 0.2 * e_norm)
 
         segments.append({
             "section_type": section_type,
@@ -392,10 +846,64 @@ def classify_segments(
     return segments
 
 
-def extract_structure(y: np.ndarray, sr: int, beat_times: np.ndarray) -> Dict[str, Any]:
+def checkerboard_novelty(rec: Any, half: int) -> np.ndarray:
+    """Foote checkerboard novelty along the diagonal of a recurrence matrix.
+
+    For each frame i this is the sum of the two within-section quadrants
+    ``rec[i-h:i, i-h:i]`` and ``rec[i:i+h, i:i+h]`` minus the two
+    cross-section quadrants, with zero fill past the edges -- the diagonal
+    of a 2-D convolution with a (2h, 2h) checkerboard kernel. No quadrant
+    reaches further than 2h-1 off the diagonal, so only that band is read:
+    each diagonal gets a prefix sum and a quadrant sum is two lookups per
+    diagonal, O(N*h) time and memory.
+
+    Args:
+        rec: (N, N) recurrence matrix, dense or scipy.sparse.
+        half: Kernel half-width h in frames.
+
+    Returns:
+        (N,) novelty curve (signed).
+    """
+    n = rec.shape[0]
+    if hasattr(rec, 'tocsr'):
+        rec = rec.tocsr()
+    offsets = np.arange(-(2 * half - 1), 2 * half)
+
+    # prefix[k, r] = sum of rec[q, q + offsets[k]] for q < r
+    prefix = np.zeros((len(offsets), n + 1))
+    for k, d in enumerate(offsets):
+        diag = np.asarray(rec.diagonal(d), dtype=np.float64).ravel()
+        start = max(0, -d)
+        prefix[k, start + 1:start + 1 + len(diag)] = np.cumsum(diag)
+        prefix[k, start + 1 + len(diag):] = prefix[k, start + len(diag)]
+
+    d = offsets[:, None]
+
+    def box(r0: np.ndarray, r1: np.ndarray, c0: np.ndarray, c1: np.ndarray) -> np.ndarray:
+        # Rows r in [r0, r1) whose column r + d falls in [c0, c1), per diagonal
+        start = np.clip(np.maximum(r0, c0 - d), 0, n)
+        stop = np.clip(np.minimum(r1, c1 - d), 0, n)
+        stop = np.maximum(start, stop)
+        return (np.take_along_axis(prefix, stop, axis=1)
+                - np.take_along_axis(prefix, start, axis=1)).sum(axis=0)
+
+    i = np.arange(n)
+    lo = np.maximum(i - half, 0)
+    hi = np.minimum(i + half, n)
+    within = box(lo, i, lo, i) + box(i, hi, i, hi)
+    across = box(lo, i, i, hi) + box(i, hi, lo, i)
+    return within - across
+
+
+def extract_structure(
+    y: np.ndarray,
+    sr: int,
+    beat_times: np.ndarray,
+    ctx: Optional[AnalysisContext] = None
+) -> Dict[str, Any]:
     """US-001: Extract structural segmentation from audio.
 
-    Uses chroma CQT self-similarity, checkerboard kernel novelty (scipy) or
+    Uses chroma self-similarity, checkerboard kernel novelty or
     agglomerative clustering (fallback) to detect section boundaries, then
     classifies each segment via energy-based heuristics.
 
@@ -403,16 +911,21 @@ def extract_structure(y: np.ndarray, sr: int, beat_times: np.ndarray) -> Dict[st
         y: Audio time series.
         sr: Sample rate.
         beat_times: Array of beat onset times in seconds.
+        ctx: Shared analysis context; built from (y, sr, beat_times) if omitted.
 
     Returns:
         Dictionary with segments, bar_times, time_signature, etc.
     """
+    if ctx is None:
+        ctx = AnalysisContext(y, sr, beat_times)
     duration = librosa.get_duration(y=y, sr=sr)
 
+    # Time signature and bar grid
+    ts = ctx.time_signature
+    bar_times = ctx.bar_times
+
     # Edge case: very short track (< 30s) or no beats
     if duration < 30.0 or len(beat_times) < 4:
-        ts = _detect_time_signature(beat_times)
-        bar_times = compute_bar_grid(beat_times, ts["beats_per_bar"])
         single_segment = {
             "section_type": "intro",
             "start_time": 0.0,
@@ -427,51 +940,42 @@ def extract_structure(y: np.ndarray, sr: int, beat_times: np.ndarray) -> Dict[st
             "bar_times": bar_times.tolist(),
             "segment_count": 1,
             "time_signature": ts,
-            "analysis_version": "2.0.0"
+            "analysis_version": ANALYSIS_VERSION
         }
 
-    # Compute chroma CQT (memory-efficient hop)
-    chroma = librosa.feature.chroma_cqt(y=y, sr=sr, hop_length=4096)
+    # STFT chroma at a coarse hop: grouping and novelty only need pitch-class
+    # energy per ~0.2s frame, not CQT's log-frequency resolution
+    chroma = ctx.chroma_stft(4096)
 
     # Build self-similarity / recurrence matrix
+    # Kept sparse: only the nearest-neighbour links are non-zero, and the
+    # novelty kernel reads a narrow band around the diagonal anyway
     rec = librosa.segment.recurrence_matrix(
-        chroma, mode='affinity', metric='cosine', sparse=False
-    )
+        chroma, mode='affinity', metric='cosine', sparse=True
+    ).astype(np.float32, copy=False)
 
     # Detect boundaries
     boundaries_frames = None
 
-    if HAS_SCIPY:
-        # Checkerboard kernel novelty on the diagonal of the recurrence matrix
-        try:
-            # Build a small checkerboard kernel
-            kern_size = min(32, rec.shape[0] // 4)
-            if kern_size < 4:
-                kern_size = 4
-            half = kern_size // 2
-            kernel = np.ones((kern_size, kern_size))
-            kernel[:half, half:] = -1
-            kernel[half:, :half] = -1
-
-            # Extract diagonal band and convolve
-            diag = np.diag(rec)
-            # Full 2D convolution on the recurrence matrix for novelty
-            novelty_2d = convolve2d(rec, kernel, mode='same', boundary='fill', fillvalue=0)
-            # Take the diagonal of the convolved matrix as novelty curve
-            novelty = np.abs(np.diag(novelty_2d))
-
-            # Smooth and peak-pick
-            novelty = np.convolve(novelty, np.hanning(9) / np.sum(np.hanning(9)), mode='same')
-            # Adaptive threshold: mean + 0.5*std
-            threshold = np.mean(novelty) + 0.5 * np.std(novelty)
-            peaks = []
-            for idx in range(1, len(novelty) - 1):
-                if novelty[idx] > novelty[idx - 1] and novelty[idx] > novelty[idx + 1] and novelty[idx] > threshold:
-                    peaks.append(idx)
-            if len(peaks) >= 2:
-                boundaries_frames = np.array([0] + peaks + [chroma.shape[1] - 1])
-        except Exception:
-            boundaries_frames = None
+    # Checkerboard kernel novelty on the diagonal of the recurrence matrix
+    try:
+        # Small checkerboard kernel
+        kern_size = min(32, rec.shape[0] // 4)
+        if kern_size < 4:
+            kern_size = 4
+        novelty = np.abs(checkerboard_novelty(rec, kern_size // 2))
+
+        # Smooth and peak-pick
+        novelty = np.convolve(novelty, np.hanning(9) / np.sum(np.hanning(9)), mode='same')
+        # Adaptive threshold: mean + 0.5*std
+        threshold = np.mean(novelty) + 0.5 * np.std(novelty)
+        # Strict local maxima above threshold, found with vector comparisons
+        mid = novelty[1:-1]
+        peaks = np.flatnonzero((mid > novelty[:-2]) & (mid > novelty[2:]) & (mid > threshold)) + 1
+        if len(peaks) >= 2:
+            boundaries_frames = np.concatenate([[0], peaks, [chroma.shape[1] - 1]])
+    except Exception:
+        boundaries_frames = None
 
     if boundaries_frames is None:
         # Fallback: agglomerative clustering
@@ -512,18 +1016,14 @@ def extract_structure(y: np.ndarray, sr: int, beat_times: np.ndarray) -> Dict[st
     boundaries_times = np.unique(boundaries_times)
 
     # Classify segments
-    segments = classify_segments(boundaries_times, y, sr, rec)
-
-    # Time signature and bar grid
-    ts = _detect_time_signature(beat_times)
-    bar_times = compute_bar_grid(beat_times, ts["beats_per_bar"])
+    segments = classify_segments(boundaries_times, y, sr, rec, chroma=chroma, hop_length=4096, ctx=ctx)
 
     return {
         "segments": segments,
         "bar_times": bar_times.tolist(),
         "segment_count": len(segments),
         "time_signature": ts,
-        "analysis_version": "2.0.0"
+        "analysis_version": ANALYSIS_VERSION
     }
 
 
@@ -531,69 +1031,117 @@ def extract_structure(y: np.ndarray, sr: int, beat_times: np.ndarray) -> Dict[st
 # US-002: Loop Point Detection
 # ---------------------------------------------------------------------------
 
-def _chroma_similarity(y: np.ndarray, sr: int, t1: float, t2: float, window: float = 0.5) -> float:
-    """Compute chroma cosine similarity between two time points."""
-    hw = int(window * sr / 2)
-    s1 = max(0, int(t1 * sr) - hw)
-    e1 = min(len(y), int(t1 * sr) + hw)
-    s2 = max(0, int(t2 * sr) - hw)
-    e2 = min(len(y), int(t2 * sr) + hw)
+def compute_loop_features(
+    y: np.ndarray,
+    sr: int,
+    hop_length: int = 2048,
+    ctx: Optional[AnalysisContext] = None
+) -> Dict[str, Any]:
+    """Whole-track frame features used to score loop candidates.
 
-    if e1 - s1 < sr // 8 or e2 - s2 < sr // 8:
-        return 0.0
+    Computed once so each candidate boundary is scored by slicing frames
+    rather than re-running CQT/STFT on half-second windows.
 
-    c1 = np.mean(librosa.feature.chroma_cqt(y=y[s1:e1], sr=sr, hop_length=2048), axis=1)
-    c2 = np.mean(librosa.feature.chroma_cqt(y=y[s2:e2], sr=sr, hop_length=2048), axis=1)
-    n1, n2 = np.linalg.norm(c1), np.linalg.norm(c2)
-    if n1 == 0 or n2 == 0:
-        return 0.0
-    return float(np.dot(c1, c2) / (n1 * n2))
+    Returns:
+        {"hop_length", "chroma" (12, T), "rms" (T,), "centroid" (T,)}
+    """
+    if ctx is None:
+        ctx = AnalysisContext(y, sr)
+    return {
+        "hop_length": hop_length,
+        "chroma": ctx.chroma_cqt(hop_length),
+        "rms": ctx.rms(hop_length, frame_length=hop_length),
+        "centroid": ctx.spectral_centroid(hop_length, n_fft=hop_length)
+    }
 
 
-def _energy_match(y: np.ndarray, sr: int, t1: float, t2: float, window: float = 0.5) -> float:
-    """Compute energy similarity between two time points."""
-    hw = int(window * sr / 2)
-    s1 = max(0, int(t1 * sr) - hw)
-    e1 = min(len(y), int(t1 * sr) + hw)
-    s2 = max(0, int(t2 * sr) - hw)
-    e2 = min(len(y), int(t2 * sr) + hw)
+def compute_loop_quality(
+    y: np.ndarray, sr: int, start: float, end: float,
+    feats: Optional[Dict[str, Any]] = None
+) -> float:
+    """Score a loop candidate: chroma*0.5 + energy*0.3 + spectral*0.2.
+
+    Pass ``feats`` from compute_loop_features when scoring many candidates,
+    or better, score them together with score_loop_candidates.
+    """
+    if feats is None:
+        feats = compute_loop_features(y, sr)
+    return float(score_loop_candidates(y, sr, np.array([start]), np.array([end]), feats)[0])
+
+
+def _window_means(frames: np.ndarray, starts: np.ndarray, ends: np.ndarray, hop_length: int) -> np.ndarray:
+    """Vectorised _window_mean: one frame mean per [start, end) sample range.
+
+    Returns:
+        (..., W) array, the time axis of ``frames`` replaced by one column
+        per window.
+    """
+    n_frames = frames.shape[-1]
+    f0 = np.minimum(starts // hop_length, n_frames - 1)
+    f1 = np.minimum(np.maximum(f0 + 1, -(-ends // hop_length)), n_frames)
+    csum = np.zeros(frames.shape[:-1] + (n_frames + 1,))
+    csum[..., 1:] = np.cumsum(frames, axis=-1, dtype=np.float64)
+    return (csum[..., f1] - csum[..., f0]) / (f1 - f0)
 
-    if e1 - s1 < sr // 8 or e2 - s2 < sr // 8:
-        return 0.0
 
-    rms1 = float(np.mean(librosa.feature.rms(y=y[s1:e1])[0]))
-    rms2 = float(np.mean(librosa.feature.rms(y=y[s2:e2])[0]))
-    max_rms = max(rms1, rms2)
-    if max_rms == 0:
-        return 1.0
-    return 1.0 - abs(rms1 - rms2) / max_rms
+def _relative_match(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """1 - |a - b| / max(a, b) elementwise, 1 where both are zero."""
+    peak = np.maximum(a, b)
+    return 1.0 - np.divide(np.abs(a - b), peak, out=np.zeros_like(peak), where=peak != 0)
 
 
-def _spectral_match(y: np.ndarray, sr: int, t1: float, t2: float, window: float = 0.5) -> float:
-    """Compute spectral centroid similarity between two time points."""
+def score_loop_candidates(
+    y: np.ndarray,
+    sr: int,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    feats: Dict[str, Any],
+    window: float = 0.5
+) -> np.ndarray:
+    """compute_loop_quality for many (start, end) pairs at once.
+
+    Every boundary window is pooled from the whole-track features with a
+    cumulative sum and the chroma cosine, energy and spectral matches are
+    evaluated as array expressions, so scoring thousands of candidates is a
+    handful of vector ops instead of three Python calls each.
+
+    Args:
+        y: Audio time series.
+        sr: Sample rate.
+        starts: Candidate start times in seconds.
+        ends: Candidate end times in seconds.
+        feats: Frame features from compute_loop_features.
+        window: Boundary window length in seconds.
+
+    Returns:
+        (W,) scores, chroma*0.5 + energy*0.3 + spectral*0.2.
+    """
+    hop = feats["hop_length"]
     hw = int(window * sr / 2)
-    s1 = max(0, int(t1 * sr) - hw)
-    e1 = min(len(y), int(t1 * sr) + hw)
-    s2 = max(0, int(t2 * sr) - hw)
-    e2 = min(len(y), int(t2 * sr) + hw)
 
-    if e1 - s1 < sr // 8 or e2 - s2 < sr // 8:
-        return 0.0
+    def bounds(t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        centre = (np.asarray(t) * sr).astype(np.int64)
+        # The bar grid extrapolates past the last beat, so a window can
+        # start after the end of the track; clip both edges
+        return np.clip(centre - hw, 0, len(y)), np.clip(centre + hw, 0, len(y))
+
+    s1, e1 = bounds(starts)
+    s2, e2 = bounds(ends)
+    # Windows clipped shorter than 1/8 s at the track edges score zero
+    valid = (e1 - s1 >= sr // 8) & (e2 - s2 >= sr // 8)
 
-    sc1 = float(np.mean(librosa.feature.spectral_centroid(y=y[s1:e1], sr=sr)[0]))
-    sc2 = float(np.mean(librosa.feature.spectral_centroid(y=y[s2:e2], sr=sr)[0]))
-    max_sc = max(sc1, sc2)
-    if max_sc == 0:
-        return 1.0
-    return 1.0 - abs(sc1 - sc2) / max_sc
+    c1 = _window_means(feats["chroma"], s1, e1, hop)
+    c2 = _window_means(feats["chroma"], s2, e2, hop)
+    norms = np.linalg.norm(c1, axis=0) * np.linalg.norm(c2, axis=0)
+    dots = np.einsum('cw,cw->w', c1, c2)
+    cs = np.divide(dots, norms, out=np.zeros_like(dots), where=norms != 0)
 
+    em = _relative_match(_window_means(feats["rms"], s1, e1, hop),
+                         _window_means(feats["rms"], s2, e2, hop))
+    sm = _relative_match(_window_means(feats["centroid"], s1, e1, hop),
+                         _window_means(feats["centroid"], s2, e2, hop))
 
-def compute_loop_quality(y: np.ndarray, sr: int, start: float, end: float) -> float:
-    """Score a loop candidate: chroma*0.5 + energy*0.3 + spectral*0.2."""
-    cs = _chroma_similarity(y, sr, start, end)
-    em = _energy_match(y, sr, start, end)
-    sm = _spectral_match(y, sr, start, end)
-    return cs * 0.5 + em * 0.3 + sm * 0.2
+    return np.where(valid, cs * 0.5 + em * 0.3 + sm * 0.2, 0.0)
 
 
 def find_section_for_time(segments: List[Dict[str, Any]], t: float) -> str:
@@ -612,7 +1160,8 @@ def extract_loop_points(
     beat_times: np.ndarray,
     segments: List[Dict[str, Any]],
     bar_times: Optional[np.ndarray] = None,
-    beats_per_bar: int = 4
+    beats_per_bar: int = 4,
+    ctx: Optional[AnalysisContext] = None
 ) -> Dict[str, Any]:
     """US-002: Detect bar-aligned loop point candidates.
 
@@ -626,6 +1175,7 @@ def extract_loop_points(
         segments: Structural segments from extract_structure.
         bar_times: Pre-computed bar boundary times (optional).
         beats_per_bar: Beats per bar used for bar grid.
+        ctx: Optional shared context to read frame features from.
 
     Returns:
         {"recommended": top 5, "all": all with score >= 0.6}
@@ -637,31 +1187,42 @@ def extract_loop_points(
         return {"recommended": [], "all": []}
 
     candidates: List[Dict[str, Any]] = []
+    feats = compute_loop_features(y, sr, ctx=ctx)
 
+    # Enumerate every (bar, length) pair first, then score them in one batch
+    bar_list = np.asarray(bar_times, dtype=float).tolist()
+    pairs: List[Tuple[int, float, float]] = []
     for bar_len in [1, 2, 4, 8, 16]:
-        for i in range(len(bar_times) - bar_len):
-            start_t = float(bar_times[i])
-            end_idx = i + bar_len
-            if end_idx >= len(bar_times):
-                break
-            end_t = float(bar_times[end_idx])
+        for i in range(len(bar_list) - bar_len):
+            start_t = bar_list[i]
+            end_t = bar_list[i + bar_len]
             if end_t - start_t < 0.5:
                 continue
-
-            score = compute_loop_quality(y, sr, start_t, end_t)
-            section_label = find_section_for_time(segments, start_t)
-            loop_beats = bar_len * beats_per_bar
-
-            candidates.append({
-                "loop_start_ms": int(start_t * 1000),
-                "loop_end_ms": int(end_t * 1000),
-                "loop_beats": loop_beats,
-                "loop_bars": bar_len,
-                "quality_score": round(float(score), 4),
-                "section_label": section_label,
-                "bar_aligned": True,
-                "recommended": False  # will be set below
-            })
+            pairs.append((bar_len, start_t, end_t))
+
+    scores: List[float] = []
+    if pairs:
+        scores = score_loop_candidates(
+            y, sr,
+            np.array([p[1] for p in pairs]),
+            np.array([p[2] for p in pairs]),
+            feats
+        ).tolist()
+
+    for (bar_len, start_t, end_t), score in zip(pairs, scores):
+        section_label = find_section_for_time(segments, start_t)
+        loop_beats = bar_len * beats_per_bar
+
+        candidates.append({
+            "loop_start_ms": int(start_t * 1000),
+            "loop_end_ms": int(end_t * 1000),
+            "loop_beats": loop_beats,
+            "loop_bars": bar_len,
+            "quality_score": round(float(score), 4),
+            "section_label": section_label,
+            "bar_aligned": True,
+            "recommended": False  # will be set below
+        })
 
     # Filter and sort
     passing = [c for c in candidates if c["quality_score"] >= 0.6]
@@ -696,151 +1257,251 @@ def detect_key_changes(
     sr: int,
     window_sec: float = 4.0,
     hop_sec: float = 2.0,
-    hysteresis: float = 0.15
+    hysteresis: float = 0.15,
+    ctx: Optional[AnalysisContext] = None
 ) -> List[Dict[str, Any]]:
     """Detect key changes via windowed chroma analysis with hysteresis.
 
+    Window chroma means are pooled from one whole-track chromagram with a
+    cumulative sum, and every window is scored against all 24 scales in a
+    single matmul; only the marker emission is a Python loop.
+
     Args:
         y: Audio time series.
         sr: Sample rate.
         window_sec: Analysis window size in seconds.
         hop_sec: Hop between windows (50% overlap by default).
         hysteresis: Minimum cosine distance to register a key change.
+        ctx: Optional shared context to read the chromagram from.
 
     Returns:
         List of key_change marker dicts.
     """
-    pitch_classes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+    frame_hop = 2048
     win_samples = int(window_sec * sr)
     hop_samples = int(hop_sec * sr)
+    if win_samples > len(y) or hop_samples <= 0:
+        return []
+
+    if ctx is None:
+        ctx = AnalysisContext(y, sr)
+    chroma = ctx.chroma_stft(frame_hop)
+
+    # Window k covers samples [k*hop, k*hop + win); mean its frames in O(1)
+    starts = np.arange(0, len(y) - win_samples + 1, hop_samples)
+    f0 = np.minimum(starts // frame_hop, chroma.shape[1] - 1)
+    f1 = np.minimum(np.maximum(f0 + 1, (starts + win_samples) // frame_hop), chroma.shape[1])
+    csum = np.zeros((chroma.shape[0], chroma.shape[1] + 1))
+    csum[:, 1:] = np.cumsum(chroma, axis=1, dtype=np.float64)
+    pooled = (csum[:, f1] - csum[:, f0]) / (f1 - f0)
+
+    # All windows against all 24 scales at once: (24, 12) @ (12, W)
+    norms = np.linalg.norm(pooled, axis=0)
+    voiced = norms > 0
+    scores = _SCALE_PROFILES @ np.divide(pooled, norms, out=np.zeros_like(pooled), where=voiced)
+    best_idx = np.argmax(scores, axis=0)
+    best_corrs = scores[best_idx, np.arange(len(starts))]
 
     markers: List[Dict[str, Any]] = []
     prev_key_idx: Optional[int] = None
     prev_mode: Optional[str] = None
 
-    major_profile = np.array([1, 0, 1, 0, 1, 1, 0, 1, 0, 1, 0, 1], dtype=float)
-    minor_profile = np.array([1, 0, 1, 1, 0, 1, 0, 1, 1, 0, 1, 0], dtype=float)
-
-    pos = 0
-    while pos + win_samples <= len(y):
-        segment = y[pos:pos + win_samples]
-        chroma = librosa.feature.chroma_cqt(y=segment, sr=sr, hop_length=2048)
-        chroma_mean = np.mean(chroma, axis=1)
-        chroma_norm = np.linalg.norm(chroma_mean)
-        if chroma_norm == 0:
-            pos += hop_samples
-            continue
-
-        # Find dominant key
-        best_corr = -1.0
-        best_key = 0
-        best_mode = "major"
-        for k in range(12):
-            maj_corr = float(np.dot(np.roll(major_profile, k), chroma_mean)) / chroma_norm
-            min_corr = float(np.dot(np.roll(minor_profile, k), chroma_mean)) / chroma_norm
-            if maj_corr > best_corr:
-                best_corr = maj_corr
-                best_key = k
-                best_mode = "major"
-            if min_corr > best_corr:
-                best_corr = min_corr
-                best_key = k
-                best_mode = "minor"
-
-        time_sec = pos / sr
+    for w in np.flatnonzero(voiced):
+        best = int(best_idx[w])
+        best_corr = float(best_corrs[w])
+        best_key = best // 2
+        best_mode = "major" if best % 2 == 0 else "minor"
 
         if prev_key_idx is not None and (best_key != prev_key_idx or best_mode != prev_mode):
-            # Compute cosine distance between previous and current chroma
-            if chroma_norm > 0:
-                # Use hysteresis to avoid spurious detections
-                change_magnitude = 1.0 - best_corr  # rough proxy
-                if change_magnitude >= hysteresis:
-                    markers.append({
-                        "marker_type": "key_change",
-                        "position_ms": int(time_sec * 1000),
-                        "position_end_ms": None,
-                        "description": f"Key change to {pitch_classes[best_key]} {best_mode}",
-                        "intensity": round(float(min(1.0, change_magnitude / 0.5)), 4),
-                        "metadata": {
-                            "from_key": f"{pitch_classes[prev_key_idx]} {prev_mode}",
-                            "to_key": f"{pitch_classes[best_key]} {best_mode}",
-                            "confidence": round(float(best_corr), 4)
-                        }
-                    })
+            # Use hysteresis to avoid spurious detections
+            change_magnitude = 1.0 - best_corr  # rough proxy
+            if change_magnitude >= hysteresis:
+                markers.append({
+                    "marker_type": "key_change",
+                    "position_ms": int(starts[w] / sr * 1000),
+                    "position_end_ms": None,
+                    "description": f"Key change to {PITCH_CLASSES[best_key]} {best_mode}",
+                    "intensity": round(float(min(1.0, change_magnitude / 0.5)), 4),
+                    "metadata": {
+                        "from_key": f"{PITCH_CLASSES[prev_key_idx]} {prev_mode}",
+                        "to_key": f"{PITCH_CLASSES[best_key]} {best_mode}",
+                        "confidence": round(best_corr, 4)
+                    }
+                })
 
         prev_key_idx = best_key
         prev_mode = best_mode
-        pos += hop_samples
 
     return markers
 
 
-def detect_energy_transitions(y: np.ndarray, sr: int, window_sec: float = 2.0) -> List[Dict[str, Any]]:
+def _cumulative_energy(y: np.ndarray) -> np.ndarray:
+    """Prefix sums of y**2 in float64, length len(y) + 1 (leading zero)."""
+    csum = np.empty(len(y) + 1)
+    csum[0] = 0.0
+    np.square(y, out=csum[1:])
+    np.cumsum(csum[1:], out=csum[1:])
+    return csum
+
+
+def _block_rms(
+    y: np.ndarray, sr: int, hop: int, energy: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """RMS of consecutive non-overlapping ``hop``-sample blocks (tail dropped).
+
+    Each block is a difference of two prefix sums of y**2, so any number of
+    block sizes cost one pass over ``y`` when ``energy`` (from
+    _cumulative_energy) is shared between them.
+
+    Returns:
+        (rms, start_times) arrays, one entry per whole block.
+    """
+    if hop <= 0 or len(y) < hop:
+        return np.zeros(0), np.zeros(0)
+    n_blocks = len(y) // hop
+    if energy is None:
+        energy = _cumulative_energy(y)
+    # Rounding in the running sum can leave a silent block slightly negative
+    block_energy = np.maximum(np.diff(energy[:n_blocks * hop + 1:hop]), 0.0)
+    return np.sqrt(block_energy / hop), np.arange(n_blocks) * hop / sr
+
+
+def _framed_rms(
+    y: np.ndarray, hop: int, frame_length: int = 2048, energy: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Framewise RMS matching librosa.feature.rms(y, frame_length, hop_length).
+
+    Frames are centred on each hop with zero padding past the edges, as with
+    librosa's default center=True. Every frame is a difference of two prefix
+    sums, so any number of hops and frame lengths share one pass over ``y``.
+
+    Returns:
+        RMS per frame in ``y``'s dtype.
+    """
+    if energy is None:
+        energy = _cumulative_energy(y)
+    pad = frame_length // 2
+    n_frames = 1 + (len(y) + 2 * pad - frame_length) // hop
+    lo = np.arange(n_frames) * hop - pad
+    hi = np.clip(lo + frame_length, 0, len(y))
+    np.clip(lo, 0, len(y), out=lo)
+    frame_energy = np.maximum(energy[hi] - energy[lo], 0.0)
+    return np.sqrt(frame_energy / frame_length).astype(y.dtype, copy=False)
+
+
+def detect_energy_transitions(
+    y: np.ndarray,
+    sr: int,
+    window_sec: float = 2.0,
+    ctx: Optional[AnalysisContext] = None
+) -> List[Dict[str, Any]]:
     """Detect energy rise and drop transitions via RMS gradient.
 
     Args:
         y: Audio time series.
         sr: Sample rate.
         window_sec: RMS analysis window.
+        ctx: Optional shared context to read block RMS from.
 
     Returns:
         List of energy_rise / energy_drop marker dicts.
     """
     hop = int(window_sec * sr)
-    rms_values = []
-    times = []
-
-    pos = 0
-    while pos + hop <= len(y):
-        rms_val = float(np.sqrt(np.mean(y[pos:pos + hop] ** 2)))
-        rms_values.append(rms_val)
-        times.append(pos / sr)
-        pos += hop
+    rms_arr, times = ctx.block_rms(hop) if ctx is not None else _block_rms(y, sr, hop)
 
-    if len(rms_values) < 3:
+    if len(rms_arr) < 3:
         return []
 
-    rms_arr = np.array(rms_values)
     gradient = np.gradient(rms_arr)
-    grad_std = np.std(gradient)
+    grad_std = float(np.std(gradient))
     if grad_std == 0:
         return []
 
     markers: List[Dict[str, Any]] = []
     threshold = 1.0 * grad_std
 
-    for i in range(1, len(gradient) - 1):
-        if gradient[i] > threshold:
-            markers.append({
-                "marker_type": "energy_rise",
-                "position_ms": int(times[i] * 1000),
-                "position_end_ms": int(times[min(i + 1, len(times) - 1)] * 1000),
-                "description": "Significant energy increase",
-                "intensity": round(float(min(1.0, gradient[i] / (2 * grad_std))), 4),
-                "metadata": {
-                    "gradient": round(float(gradient[i]), 6),
-                    "rms_before": round(float(rms_arr[i - 1]), 6),
-                    "rms_after": round(float(rms_arr[i]), 6)
-                }
-            })
-        elif gradient[i] < -threshold:
-            markers.append({
-                "marker_type": "energy_drop",
-                "position_ms": int(times[i] * 1000),
-                "position_end_ms": int(times[min(i + 1, len(times) - 1)] * 1000),
-                "description": "Significant energy decrease",
-                "intensity": round(float(min(1.0, abs(gradient[i]) / (2 * grad_std))), 4),
-                "metadata": {
-                    "gradient": round(float(gradient[i]), 6),
-                    "rms_before": round(float(rms_arr[i - 1]), 6),
-                    "rms_after": round(float(rms_arr[i]), 6)
-                }
-            })
+    # Only the few flagged windows become markers; convert to Python floats
+    # once instead of boxing NumPy scalars per field
+    flagged = np.flatnonzero(np.abs(gradient[1:-1]) > threshold) + 1
+    grad_l, rms_l, times_l = gradient.tolist(), rms_arr.tolist(), times.tolist()
+
+    for i in flagged.tolist():
+        g = grad_l[i]
+        rising = g > 0
+        markers.append({
+            "marker_type": "energy_rise" if rising else "energy_drop",
+            "position_ms": int(times_l[i] * 1000),
+            "position_end_ms": int(times_l[min(i + 1, len(times_l) - 1)] * 1000),
+            "description": "Significant energy increase" if rising else "Significant energy decrease",
+            "intensity": round(min(1.0, abs(g) / (2 * grad_std)), 4),
+            "metadata": {
+                "gradient": round(g, 6),
+                "rms_before": round(rms_l[i - 1], 6),
+                "rms_after": round(rms_l[i], 6)
+            }
+        })
 
     return markers
 
 
-def detect_drops(y: np.ndarray, sr: int, window_sec: float = 1.0) -> List[Dict[str, Any]]:
+@njit(cache=True)
+def _scan_drops(rms: np.ndarray, mean_rms: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices of (dip, spike) pairs for detect_drops.
+
+    A dip is a window below 0.3x the mean RMS; its spike is the first of the
+    next two windows above 1.5x. At most one spike per dip.
+    """
+    n = rms.shape[0]
+    dips = np.empty(n, dtype=np.int64)
+    spikes = np.empty(n, dtype=np.int64)
+    count = 0
+    for i in range(1, n - 2):
+        if rms[i] < 0.3 * mean_rms:
+            for j in range(1, min(3, n - i)):
+                if rms[i + j] > 1.5 * mean_rms:
+                    dips[count] = i
+                    spikes[count] = i + j
+                    count += 1
+                    break
+    return dips[:count], spikes[:count]
+
+
+@njit(cache=True)
+def _scan_rising_runs(rms: np.ndarray, bw: np.ndarray, min_frames: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Inclusive (start, end) window indices of runs where RMS and bandwidth both rise.
+
+    A run starts at the window before the first rise and must span at least
+    ``min_frames`` windows.
+    """
+    n = rms.shape[0]
+    starts = np.empty(n, dtype=np.int64)
+    ends = np.empty(n, dtype=np.int64)
+    count = 0
+    run_start = -1
+    for i in range(1, n):
+        if rms[i] > rms[i - 1] and bw[i] > bw[i - 1]:
+            if run_start < 0:
+                run_start = i - 1
+        else:
+            if run_start >= 0 and i - run_start >= min_frames:
+                starts[count] = run_start
+                ends[count] = i - 1
+                count += 1
+            run_start = -1
+    # Run that extends to the end of the track
+    if run_start >= 0 and n - run_start >= min_frames:
+        starts[count] = run_start
+        ends[count] = n - 1
+        count += 1
+    return starts[:count], ends[:count]
+
+
+def detect_drops(
+    y: np.ndarray,
+    sr: int,
+    window_sec: float = 1.0,
+    ctx: Optional[AnalysisContext] = None
+) -> List[Dict[str, Any]]:
     """Detect drops: energy dip followed by a spike.
 
     A 'drop' is defined as a frame where RMS drops below 0.3x the local mean
@@ -850,58 +1511,58 @@ def detect_drops(y: np.ndarray, sr: int, window_sec: float = 1.0) -> List[Dict[s
         y: Audio time series.
         sr: Sample rate.
         window_sec: RMS window size.
+        ctx: Optional shared context to read block RMS from.
 
     Returns:
         List of drop marker dicts.
     """
     hop = int(window_sec * sr)
-    rms_values = []
-    times = []
-
-    pos = 0
-    while pos + hop <= len(y):
-        rms_val = float(np.sqrt(np.mean(y[pos:pos + hop] ** 2)))
-        rms_values.append(rms_val)
-        times.append(pos / sr)
-        pos += hop
+    rms_arr, times = ctx.block_rms(hop) if ctx is not None else _block_rms(y, sr, hop)
 
-    if len(rms_values) < 4:
+    if len(rms_arr) < 4:
         return []
 
-    rms_arr = np.array(rms_values)
-    mean_rms = np.mean(rms_arr)
+    mean_rms = float(np.mean(rms_arr))
     if mean_rms == 0:
         return []
 
-    markers: List[Dict[str, Any]] = []
+    dips, spikes = _scan_drops(np.ascontiguousarray(rms_arr, dtype=np.float64), mean_rms)
 
-    for i in range(1, len(rms_arr) - 2):
-        # Dip: current significantly lower than neighbors
-        if rms_arr[i] < 0.3 * mean_rms:
-            # Spike: one of the next 2 frames is significantly higher
-            for j in range(1, min(3, len(rms_arr) - i)):
-                if rms_arr[i + j] > 1.5 * mean_rms:
-                    dip_ratio = rms_arr[i] / mean_rms
-                    spike_ratio = rms_arr[i + j] / mean_rms
-                    intensity = min(1.0, (spike_ratio - dip_ratio) / 2.0)
-                    markers.append({
-                        "marker_type": "drop",
-                        "position_ms": int(times[i] * 1000),
-                        "position_end_ms": int(times[i + j] * 1000),
-                        "description": "Drop detected (energy dip then spike)",
-                        "intensity": round(float(intensity), 4),
-                        "metadata": {
-                            "dip_rms": round(float(rms_arr[i]), 6),
-                            "spike_rms": round(float(rms_arr[i + j]), 6),
-                            "mean_rms": round(float(mean_rms), 6)
-                        }
-                    })
-                    break  # Only one drop per dip
+    # Derive and round every field as whole columns, then box once per column
+    dip_rms, spike_rms = rms_arr[dips], rms_arr[spikes]
+    intensity = np.minimum(1.0, (spike_rms / mean_rms - dip_rms / mean_rms) / 2.0)
+    mean_rms_r = round(mean_rms, 6)
 
-    return markers
+    return [
+        {
+            "marker_type": "drop",
+            "position_ms": start_ms,
+            "position_end_ms": end_ms,
+            "description": "Drop detected (energy dip then spike)",
+            "intensity": intens,
+            "metadata": {
+                "dip_rms": dip,
+                "spike_rms": spike,
+                "mean_rms": mean_rms_r
+            }
+        }
+        for start_ms, end_ms, intens, dip, spike in zip(
+            (times[dips] * 1000).astype(np.int64).tolist(),
+            (times[spikes] * 1000).astype(np.int64).tolist(),
+            np.round(intensity, 4).tolist(),
+            np.round(dip_rms, 6).tolist(),
+            np.round(spike_rms, 6).tolist(),
+        )
+    ]
 
 
-def detect_buildups(y: np.ndarray, sr: int, window_sec: float = 2.0, min_frames: int = 3) -> List[Dict[str, Any]]:
+def detect_buildups(
+    y: np.ndarray,
+    sr: int,
+    window_sec: float = 2.0,
+    min_frames: int = 3,
+    ctx: Optional[AnalysisContext] = None
+) -> List[Dict[str, Any]]:
     """Detect build-ups: sustained rising energy + spectral widening.
 
     A 'build_up' is a run of >= min_frames consecutive windows where both
@@ -912,83 +1573,69 @@ def detect_buildups(y: np.ndarray, sr: int, window_sec: float = 2.0, min_frames:
         sr: Sample rate.
         window_sec: Analysis window size.
         min_frames: Minimum consecutive rising frames to qualify.
+        ctx: Optional shared context to read block RMS / bandwidth from.
 
     Returns:
         List of build_up marker dicts.
     """
     hop = int(window_sec * sr)
-    rms_values = []
-    bw_values = []
-    times = []
-
-    pos = 0
-    while pos + hop <= len(y):
-        seg = y[pos:pos + hop]
-        rms_val = float(np.sqrt(np.mean(seg ** 2)))
-        bw = float(np.mean(librosa.feature.spectral_bandwidth(y=seg, sr=sr)[0]))
-        rms_values.append(rms_val)
-        bw_values.append(bw)
-        times.append(pos / sr)
-        pos += hop
-
-    if len(rms_values) < min_frames + 1:
+    if ctx is None:
+        ctx = AnalysisContext(y, sr)
+    rms_arr, times = ctx.block_rms(hop)
+
+    if len(rms_arr) < min_frames + 1:
         return []
 
-    rms_arr = np.array(rms_values)
-    bw_arr = np.array(bw_values)
+    # One bandwidth pass over the whole track, pooled per window, instead of
+    # a separate short STFT for every window
+    frame_hop = 512
+    starts = np.arange(len(rms_arr)) * hop
+    bw_arr = _window_means(ctx.spectral_bandwidth(frame_hop), starts, starts + hop, frame_hop)
 
-    markers: List[Dict[str, Any]] = []
-    run_start: Optional[int] = None
+    run_starts, run_ends = _scan_rising_runs(
+        np.ascontiguousarray(rms_arr, dtype=np.float64),
+        np.ascontiguousarray(bw_arr, dtype=np.float64),
+        min_frames
+    )
 
-    for i in range(1, len(rms_arr)):
-        if rms_arr[i] > rms_arr[i - 1] and bw_arr[i] > bw_arr[i - 1]:
-            if run_start is None:
-                run_start = i - 1
-        else:
-            if run_start is not None and (i - run_start) >= min_frames:
-                energy_increase = rms_arr[i - 1] / max(rms_arr[run_start], 1e-10)
-                intensity = min(1.0, (energy_increase - 1.0) / 2.0)
-                markers.append({
-                    "marker_type": "build_up",
-                    "position_ms": int(times[run_start] * 1000),
-                    "position_end_ms": int(times[i - 1] * 1000),
-                    "description": f"Build-up over {i - run_start} windows ({(i - run_start) * window_sec:.1f}s)",
-                    "intensity": round(float(max(0.0, intensity)), 4),
-                    "metadata": {
-                        "duration_sec": round(float((i - run_start) * window_sec), 2),
-                        "energy_increase_ratio": round(float(energy_increase), 4),
-                        "start_rms": round(float(rms_arr[run_start]), 6),
-                        "end_rms": round(float(rms_arr[i - 1]), 6)
-                    }
-                })
-            run_start = None
+    # Derive and round every field as whole columns, then box once per column
+    n_windows = run_ends - run_starts + 1
+    start_rms, end_rms = rms_arr[run_starts], rms_arr[run_ends]
+    energy_increase = end_rms / np.maximum(start_rms, 1e-10)
+    intensity = np.clip((energy_increase - 1.0) / 2.0, 0.0, 1.0)
 
-    # Handle run that extends to end
-    if run_start is not None and (len(rms_arr) - run_start) >= min_frames:
-        energy_increase = rms_arr[-1] / max(rms_arr[run_start], 1e-10)
-        intensity = min(1.0, (energy_increase - 1.0) / 2.0)
-        markers.append({
+    return [
+        {
             "marker_type": "build_up",
-            "position_ms": int(times[run_start] * 1000),
-            "position_end_ms": int(times[-1] * 1000),
-            "description": f"Build-up over {len(rms_arr) - run_start} windows ({(len(rms_arr) - run_start) * window_sec:.1f}s)",
-            "intensity": round(float(max(0.0, intensity)), 4),
+            "position_ms": start_ms,
+            "position_end_ms": end_ms,
+            "description": f"Build-up over {n} windows ({n * window_sec:.1f}s)",
+            "intensity": intens,
             "metadata": {
-                "duration_sec": round(float((len(rms_arr) - run_start) * window_sec), 2),
-                "energy_increase_ratio": round(float(energy_increase), 4),
-                "start_rms": round(float(rms_arr[run_start]), 6),
-                "end_rms": round(float(rms_arr[-1]), 6)
+                "duration_sec": round(n * window_sec, 2),
+                "energy_increase_ratio": ratio,
+                "start_rms": r0,
+                "end_rms": r1
             }
-        })
-
-    return markers
+        }
+        for n, start_ms, end_ms, intens, ratio, r0, r1 in zip(
+            n_windows.tolist(),
+            (times[run_starts] * 1000).astype(np.int64).tolist(),
+            (times[run_ends] * 1000).astype(np.int64).tolist(),
+            np.round(intensity, 4).tolist(),
+            np.round(energy_increase, 4).tolist(),
+            np.round(start_rms, 6).tolist(),
+            np.round(end_rms, 6).tolist(),
+        )
+    ]
 
 
 def extract_arrangement_markers(
     y: np.ndarray,
     sr: int,
     beat_times: np.ndarray,
-    segments: List[Dict[str, Any]]
+    segments: List[Dict[str, Any]],
+    ctx: Optional[AnalysisContext] = None
 ) -> List[Dict[str, Any]]:
     """US-003: Detect arrangement markers (key changes, energy transitions, drops, build-ups).
 
@@ -997,46 +1644,82 @@ def extract_arrangement_markers(
         sr: Sample rate.
         beat_times: Beat onset times.
         segments: Structural segments.
+        ctx: Optional shared context reused across the detectors.
 
     Returns:
         List of marker dicts sorted by position_ms.
     """
-    markers: List[Dict[str, Any]] = []
+    # The detectors are independent passes over the signal
+    found = _run_concurrently([
+        lambda: detect_key_changes(y, sr, ctx=ctx),
+        lambda: detect_energy_transitions(y, sr, ctx=ctx),
+        lambda: detect_drops(y, sr, ctx=ctx),
+        lambda: detect_buildups(y, sr, ctx=ctx),
+    ])
 
-    markers.extend(detect_key_changes(y, sr))
-    markers.extend(detect_energy_transitions(y, sr))
-    markers.extend(detect_drops(y, sr))
-    markers.extend(detect_buildups(y, sr))
+    # Each detector scans left to right, so its markers are already in time
+    # order; ties keep detector order, as the stable sort this replaces did
+    return list(heapq.merge(*found, key=operator.itemgetter("position_ms")))
 
-    # Sort by position
-    markers.sort(key=lambda m: m["position_ms"])
 
-    return markers
+def dedupe_cues(cues: List[Dict[str, Any]], window_ms: int = 500) -> List[Dict[str, Any]]:
+    """Collapse cues closer than ``window_ms`` to the most confident one.
+
+    Each cue is compared with the current representative (not its
+    predecessor), so a dense run of cues cannot chain into one cue spanning
+    far more than the window.
+
+    Args:
+        cues: Cue dicts with ``position_ms`` and ``confidence``.
+        window_ms: Cues nearer than this to the representative are merged.
+
+    Returns:
+        Deduplicated cues sorted by position_ms.
+    """
+    deduped: List[Dict[str, Any]] = []
+    rep_pos = rep_conf = None
+    for cue in sorted(cues, key=operator.itemgetter("position_ms")):
+        pos, conf = cue["position_ms"], cue["confidence"]
+        if rep_pos is not None and pos - rep_pos < window_ms:
+            if conf > rep_conf:
+                deduped[-1] = cue
+                rep_pos, rep_conf = pos, conf
+        else:
+            deduped.append(cue)
+            rep_pos, rep_conf = pos, conf
+    return deduped
 
 
 # ---------------------------------------------------------------------------
 # US-004: Energy Curve
 # ---------------------------------------------------------------------------
 
-def extract_energy_curve(y: np.ndarray, sr: int, resolution: float = 0.5) -> Dict[str, Any]:
+def extract_energy_curve(
+    y: np.ndarray,
+    sr: int,
+    resolution: float = 0.5,
+    ctx: Optional[AnalysisContext] = None
+) -> Dict[str, Any]:
     """US-004: Compute a time-series energy curve at the given resolution.
 
     Args:
         y: Audio time series.
         sr: Sample rate.
         resolution: Time resolution in seconds (default 0.5s).
+        ctx: Optional shared context; its prefix sums of y**2 (already paid
+            for by the arrangement detectors) give every frame in O(1).
 
     Returns:
         {"times": [...], "values": [...]}
     """
     hop = max(1, int(sr * resolution))
-    rms = librosa.feature.rms(y=y, hop_length=hop)[0]
-    n_frames = len(rms)
-    times = librosa.frames_to_time(np.arange(n_frames), sr=sr, hop_length=hop)
+    rms = ctx.rms(hop) if ctx is not None else librosa.feature.rms(y=y, hop_length=hop)[0]
+    # Frame i starts at i * hop samples; no need for frames_to_time's checks
+    times = np.arange(len(rms)) * (hop / sr)
 
     return {
-        "times": [round(float(t), 4) for t in times],
-        "values": [round(float(v), 6) for v in rms]
+        "times": np.round(times, 4).tolist(),
+        "values": np.round(rms, 6).tolist()
     }
 
 
@@ -1044,36 +1727,49 @@ def extract_energy_curve(y: np.ndarray, sr: int, resolution: float = 0.5) -> Dic
 # Updated main analysis function
 # ---------------------------------------------------------------------------
 
-def detect_transients(y: np.ndarray, sr: int) -> Dict[str, Any]:
+def detect_transients(
+    y: np.ndarray,
+    sr: int,
+    hop_length: int = 512,
+    onset_envelope: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
     """
     Detect transient onsets using librosa onset detection and HPSS.
 
+    Pass ``onset_envelope`` (at ``hop_length``) to reuse the envelope beat
+    tracking already computed.
+
     Returns dict with:
     - transient_times: list of onset times in seconds
     - onset_strength_mean: mean onset strength value
     - percussive_ratio: ratio of percussive to total energy (0-1)
     """
     # Compute onset strength envelope
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr)
+    onset_env = onset_envelope
+    if onset_env is None:
+        onset_env = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
     onset_strength_mean = float(np.mean(onset_env))
 
     # Detect onset frames and convert to times
-    onset_frames = librosa.onset.onset_frames(
+    onset_frames = librosa.onset.onset_detect(
         onset_envelope=onset_env,
+        sr=sr,
+        hop_length=hop_length,
         backtrack=True,
         delta=0.2
     )
-    transient_times = librosa.frames_to_time(onset_frames, sr=sr).tolist()
+    transient_times = librosa.frames_to_time(onset_frames, sr=sr, hop_length=hop_length)
 
     # HPSS: Harmonic-Percussive Source Separation
     D = np.abs(librosa.stft(y))
     H, P = librosa.decompose.hpss(D)
-    total_energy = float(np.sum(D ** 2))
-    percussive_energy = float(np.sum(P ** 2))
+    # Sums of squares without a squared copy of either spectrogram
+    total_energy = float(np.einsum('ij,ij->', D, D, dtype=np.float64))
+    percussive_energy = float(np.einsum('ij,ij->', P, P, dtype=np.float64))
     percussive_ratio = percussive_energy / total_energy if total_energy > 0 else 0.0
 
     return {
-        "transient_times": [round(t, 4) for t in transient_times],
+        "transient_times": np.round(transient_times, 4).tolist(),
         "onset_strength_mean": round(onset_strength_mean, 4),
         "percussive_ratio": round(percussive_ratio, 4)
     }
@@ -1107,10 +1803,11 @@ def classify_transients(
 
             # Energy in low band (0-300 Hz) vs total
             fft = np.abs(np.fft.rfft(frame))
-            freqs = np.fft.rfftfreq(len(frame), d=1.0 / sr)
-            low_mask = freqs < 300
-            low_energy = float(np.sum(fft[low_mask] ** 2))
-            total_energy = float(np.sum(fft ** 2))
+            # Bins below 300 Hz are a prefix of the spectrum, so both sums are
+            # dot products over views rather than squared copies
+            n_low = int(np.count_nonzero(np.fft.rfftfreq(len(frame), d=1.0 / sr) < 300))
+            low_energy = float(np.dot(fft[:n_low], fft[:n_low]))
+            total_energy = float(np.dot(fft, fft))
             low_ratio = low_energy / total_energy if total_energy > 0 else 0.0
 
             # Spectral rolloff for transient brightness
@@ -1184,13 +1881,304 @@ def compute_mfcc_embedding(y: np.ndarray, sr: int) -> Dict[str, float]:
     return {"x": round(x, 4), "y": round(y_coord, 4)}
 
 
-def analyze_audio(audio_path: str, features: List[str]) -> Dict[str, Any]:
+# Upper bound on extractor threads per analysis; past this the stages are
+# memory-bandwidth bound and extra threads only add contention
+MAX_EXTRACTOR_THREADS = 8
+
+# Per-process thread budget, lowered by batch workers that share the cores
+_extractor_threads: Optional[int] = None
+
+
+def _run_concurrently(tasks: List[Callable[[], Any]]) -> List[Any]:
+    """Run independent extractor thunks on a thread pool.
+
+    librosa spends its time in NumPy/FFT code that releases the GIL, so
+    threads overlap well. The pool is sized to the task count, capped by
+    MAX_EXTRACTOR_THREADS and the core count (or the batch worker's share of
+    the cores); a single worker runs the tasks inline. BLAS is pinned to one
+    thread per worker (when threadpoolctl is available) to avoid
+    oversubscribing the cores.
+
+    Returns:
+        Results in the same order as ``tasks``.
+    """
+    workers = min(len(tasks), _extractor_threads or MAX_EXTRACTOR_THREADS, os.cpu_count() or 1)
+    if workers <= 1:
+        return [task() for task in tasks]
+
+    limits = threadpool_limits(limits=1) if HAS_THREADPOOLCTL else contextlib.nullcontext()
+    with limits, concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+DEFAULT_SAMPLE_RATE = 22050
+
+# --preset shorthands for --analysis-hop
+ANALYSIS_PRESETS = {'fast': 1024, 'balanced': 512, 'accurate': 256}
+
+
+def load_audio(
+    audio_path: str,
+    sr: Optional[int] = DEFAULT_SAMPLE_RATE,
+    max_duration: Optional[float] = None
+) -> Tuple[np.ndarray, int, int]:
+    """Decode an audio file to a mono float32 signal.
+
+    Uses soundfile (libsndfile) when it can read the container, downmixing
+    multi-channel audio by averaging; anything it cannot decode falls back
+    to librosa.load. Sources above ``sr`` are resampled down to it (every
+    extractor's default frame sizes target ~22 kHz, so the extra bandwidth
+    only costs FFT work); lower-rate sources are never upsampled.
+
+    Args:
+        audio_path: Path to audio file
+        sr: Maximum analysis sample rate, or None to keep the native rate
+        max_duration: Decode at most this many seconds from the start (None
+            decodes the whole file), bounding peak memory on long sources
+
+    Returns:
+        (y, sr, source_sr) tuple; ``y`` is always C-contiguous float32.
+    """
+    y: Optional[np.ndarray] = None
+    if HAS_SOUNDFILE:
+        try:
+            with sf.SoundFile(audio_path) as f:
+                source_sr = f.samplerate
+                frames = -1 if max_duration is None else int(max_duration * source_sr)
+                data = f.read(frames=frames, dtype='float32', always_2d=True)
+            y = data[:, 0] if data.shape[1] == 1 else data.mean(axis=1, dtype=np.float32)
+        except Exception:
+            y = None
+    if y is None:
+        y, source_sr = librosa.load(
+            audio_path, sr=None, mono=True, duration=max_duration, dtype=np.float32
+        )
+
+    source_sr = int(source_sr)
+    if sr is not None and source_sr > sr:
+        y = librosa.resample(y, orig_sr=source_sr, target_sr=sr)
+    else:
+        sr = source_sr
+
+    # Hand every extractor the same C-contiguous float32 buffer: librosa's
+    # FFTs then stay in complex64 and no call has to re-copy or upcast it
+    return np.ascontiguousarray(y, dtype=np.float32), sr, source_sr
+
+
+# ---------------------------------------------------------------------------
+# Streaming analysis for long files
+# ---------------------------------------------------------------------------
+
+# Files above this size are streamed when every requested feature allows it
+STREAM_THRESHOLD_BYTES = 100_000_000
+
+# Features that only need time-averaged statistics, so can be accumulated
+# block by block; everything else needs the whole waveform at once
+STREAMABLE_FEATURES = {'key', 'energy', 'spectral', 'mfcc', 'chroma', 'chroma:stft'}
+
+
+class _RunningStats:
+    """Running per-row mean/variance/min/max over frame batches.
+
+    Uses Chan et al.'s pairwise update so each block is reduced with NumPy
+    and only the (d,) summaries are carried between blocks.
+    """
+
+    def __init__(self) -> None:
+        self.n = 0
+        self.mean: Optional[np.ndarray] = None
+        self.m2: Optional[np.ndarray] = None
+        self.min: Optional[np.ndarray] = None
+        self.max: Optional[np.ndarray] = None
+
+    def update(self, frames: np.ndarray) -> None:
+        """Fold in a (d, n_frames) or (n_frames,) batch."""
+        x = np.atleast_2d(frames).astype(np.float64)
+        k = x.shape[1]
+        if k == 0:
+            return
+        mean_b = x.mean(axis=1)
+        dev = x - mean_b[:, None]
+        m2_b = np.einsum('ij,ij->i', dev, dev)
+        if self.n == 0:
+            self.mean, self.m2 = mean_b, m2_b
+            self.min, self.max = x.min(axis=1), x.max(axis=1)
+        else:
+            n = self.n + k
+            delta = mean_b - self.mean
+            self.mean = self.mean + delta * (k / n)
+            self.m2 = self.m2 + m2_b + delta ** 2 * (self.n * k / n)
+            self.min = np.minimum(self.min, x.min(axis=1))
+            self.max = np.maximum(self.max, x.max(axis=1))
+        self.n += k
+
+    @property
+    def var(self) -> np.ndarray:
+        return self.m2 / max(self.n, 1)
+
+
+def can_stream(features: List[str]) -> bool:
+    """True when every requested feature can be computed block by block."""
+    return bool(features) and all(f in STREAMABLE_FEATURES for f in features)
+
+
+def _streaming_analyze(
+    audio_path: str,
+    features: List[str],
+    sample_rate: Optional[int] = DEFAULT_SAMPLE_RATE,
+    block_size: int = 2 ** 20,
+    n_fft: int = 2048,
+    hop_length: int = 512,
+    tuning: Optional[float] = None,
+    max_duration: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Analyze a file in fixed-size blocks so memory stays O(block).
+
+    Blocks are read with soundfile, overlapping by ``n_fft - hop_length``
+    samples so the uncentred frame grid continues across block boundaries,
+    and per-frame features are folded into running statistics. Output keys
+    match analyze_audio for the STREAMABLE_FEATURES. ``max_duration`` stops
+    reading after that many seconds, as in load_audio.
+
+    Returns:
+        The results, or None if soundfile is unavailable or cannot open the
+        file (the caller then loads it whole). Errors once reading has
+        started are raised.
+    """
+    if not HAS_SOUNDFILE:
+        return None
+    try:
+        info = sf.info(audio_path)
+    except sf.SoundFileError:
+        return None
+    source_sr = int(info.samplerate)
+    sr = sample_rate if sample_rate is not None and source_sr > sample_rate else source_sr
+
+    want_key = 'key' in features
+    want_energy = 'energy' in features
+    want_spectral = 'spectral' in features
+    want_mfcc = 'mfcc' in features
+    want_chroma = 'chroma' in features or 'chroma:stft' in features
+
+    rms_stats, zcr_stats = _RunningStats(), _RunningStats()
+    centroid_stats, rolloff_stats, bandwidth_stats = _RunningStats(), _RunningStats(), _RunningStats()
+    contrast_stats, flatness_stats = _RunningStats(), _RunningStats()
+    mfcc_stats, chroma_stats = _RunningStats(), _RunningStats()
+
+    # Overlap is measured in source samples; after resampling the frame grid
+    # may drift by a fraction of a hop per block, which is immaterial to
+    # time-averaged statistics
+    overlap = int(np.ceil((n_fft - hop_length) * source_sr / sr))
+    frames = -1 if max_duration is None else int(max_duration * source_sr)
+    frames_read = 0
+    for block in sf.blocks(audio_path, blocksize=block_size, overlap=overlap, frames=frames,
+                           dtype='float32', always_2d=True):
+        # Every block after the first repeats ``overlap`` frames of the last
+        frames_read += len(block) - (overlap if frames_read else 0)
+        blk = block[:, 0] if block.shape[1] == 1 else block.mean(axis=1, dtype=np.float32)
+        if sr != source_sr:
+            blk = librosa.resample(blk, orig_sr=source_sr, target_sr=sr)
+        blk = np.ascontiguousarray(blk, dtype=np.float32)
+        if len(blk) < n_fft:
+            continue
+
+        if want_energy:
+            rms_stats.update(librosa.feature.rms(
+                y=blk, frame_length=n_fft, hop_length=hop_length, center=False)[0])
+            zcr_stats.update(librosa.feature.zero_crossing_rate(
+                blk, frame_length=n_fft, hop_length=hop_length, center=False)[0])
+
+        if not (want_key or want_spectral or want_mfcc or want_chroma):
+            continue
+        S = np.abs(librosa.stft(blk, n_fft=n_fft, hop_length=hop_length, center=False))
+
+        if want_spectral:
+            centroid_stats.update(librosa.feature.spectral_centroid(S=S, sr=sr)[0])
+            rolloff_stats.update(librosa.feature.spectral_rolloff(S=S, sr=sr)[0])
+            bandwidth_stats.update(librosa.feature.spectral_bandwidth(S=S, sr=sr)[0])
+            contrast_stats.update(librosa.feature.spectral_contrast(S=S, sr=sr))
+            flatness_stats.update(librosa.feature.spectral_flatness(S=S)[0])
+
+        # MFCC and chroma both take the power spectrogram; square it once
+        power = np.square(S) if (want_mfcc or want_key or want_chroma) else None
+
+        if want_mfcc:
+            melspec = librosa.feature.melspectrogram(S=power, sr=sr)
+            mfcc_stats.update(librosa.feature.mfcc(S=librosa.power_to_db(melspec), n_mfcc=13))
+
+        if want_key or want_chroma:
+            chroma_stats.update(librosa.feature.chroma_stft(S=power, sr=sr, tuning=tuning))
+
+    results: Dict[str, Any] = {
+        "duration": float(info.frames / source_sr),
+        "sample_rate": int(sr),
+        "source_sample_rate": source_sr,
+        "samples": int(round(frames_read * sr / source_sr)),
+        "streamed": True
+    }
+    if frames_read < info.frames:
+        # Cut short by max_duration; same contract as analyze_audio
+        results["analyzed_duration"] = float(frames_read / source_sr)
+    if want_key and chroma_stats.n:
+        results.update(extract_key(np.empty(0), sr, chromagram=chroma_stats.mean[:, None]))
+    if want_energy and rms_stats.n:
+        results.update({
+            "energy": float(rms_stats.mean[0]),
+            "energy_variance": float(rms_stats.var[0]),
+            "energy_max": float(rms_stats.max[0]),
+            "energy_min": float(rms_stats.min[0]),
+            "zero_crossing_rate": float(zcr_stats.mean[0])
+        })
+    if want_spectral and centroid_stats.n:
+        results.update({
+            "spectral_centroid": float(centroid_stats.mean[0]),
+            "spectral_centroid_variance": float(centroid_stats.var[0]),
+            "spectral_rolloff": float(rolloff_stats.mean[0]),
+            "spectral_bandwidth": float(bandwidth_stats.mean[0]),
+            "spectral_contrast": contrast_stats.mean.tolist(),
+            "spectral_flatness": float(flatness_stats.mean[0])
+        })
+    if want_mfcc and mfcc_stats.n:
+        results.update({
+            "mfcc": mfcc_stats.mean.tolist(),
+            "mfcc_variance": mfcc_stats.var.tolist(),
+            "n_mfcc": 13
+        })
+    if want_chroma and chroma_stats.n:
+        results["chroma_stft"] = chroma_stats.mean.tolist()
+    return results
+
+
+def analyze_audio(
+    audio_path: str,
+    features: List[str],
+    sample_rate: Optional[int] = DEFAULT_SAMPLE_RATE,
+    stream: Optional[bool] = None,
+    hop_length: int = 512,
+    tuning: Optional[float] = None,
+    device: str = 'auto',
+    max_duration: Optional[float] = None
+) -> Dict[str, Any]:
     """
     Main analysis function - extracts requested features from audio
 
     Args:
         audio_path: Path to audio file
         features: List of features to extract
+        sample_rate: Maximum analysis sample rate (None keeps the source rate)
+        stream: Analyze in blocks instead of loading the whole waveform. None
+            streams automatically for files over STREAM_THRESHOLD_BYTES. Only
+            honoured when every requested feature is streamable.
+        hop_length: Frame hop for tempo, energy and the shared STFT. Larger
+            hops trade time resolution for speed (see ANALYSIS_PRESETS).
+        tuning: Chroma tuning offset in bins (0.0 assumes A440). None
+            estimates it once from the shared spectrogram for all chroma.
+        device: 'cuda' computes the shared STFT and MFCC with torch on the GPU,
+            'auto' does so when one is available, 'cpu' never does.
+        max_duration: Analyze only the first this-many seconds. ``duration``
+            still reports the whole file; ``analyzed_duration`` is added
+            when the signal was cut short.
 
     Returns:
         Dictionary containing all extracted features
@@ -1199,9 +2187,20 @@ def analyze_audio(audio_path: str, features: List[str]) -> Dict[str, Any]:
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
+    if stream is None:
+        stream = os.path.getsize(audio_path) > STREAM_THRESHOLD_BYTES
+    if stream and can_stream(features):
+        streamed = _streaming_analyze(
+            audio_path, features, sample_rate=sample_rate, hop_length=hop_length, tuning=tuning,
+            max_duration=max_duration
+        )
+        # None: unreadable by soundfile, so fall back to a full load
+        if streamed is not None:
+            return streamed
+
     # Load audio file
     try:
-        y, sr = librosa.load(audio_path, sr=None, mono=True)
+        y, sr, source_sr = load_audio(audio_path, sr=sample_rate, max_duration=max_duration)
     except Exception as e:
         raise ValueError(f"Failed to load audio file: {str(e)}")
 
@@ -1212,11 +2211,19 @@ def analyze_audio(audio_path: str, features: List[str]) -> Dict[str, Any]:
     results: Dict[str, Any] = {
         "duration": float(duration),
         "sample_rate": int(sr),
+        "source_sample_rate": int(source_sr),
         "samples": len(y)
     }
+    if max_duration is not None:
+        # Report the whole file's length (from its header) if it was cut short
+        file_duration = float(librosa.get_duration(path=audio_path))
+        if file_duration > duration + 1.0 / sr:
+            results["duration"] = file_duration
+            results["analyzed_duration"] = float(duration)
 
     # Determine which features to extract
-    extract_all = 'all' in features
+    wanted = frozenset(features)
+    extract_all = 'all' in wanted
 
     # -----------------------------------------------------------------------
     # Dependency resolution: some new features depend on others
@@ -1228,169 +2235,568 @@ def analyze_audio(audio_path: str, features: List[str]) -> Dict[str, Any]:
     _segments: Optional[List[Dict[str, Any]]] = None
     _bar_times: Optional[np.ndarray] = None
     _beats_per_bar: int = 4
+    # Whole-track features shared by the structure, arrangement and energy
+    # curve stages; beat_times is filled in once tempo is known
+    _context = AnalysisContext(y, sr)
+    _markers: Optional[List[Dict[str, Any]]] = None
+    _spectrogram: Optional[np.ndarray] = None
+    _spectrogram_gpu = None
+    _power: Optional[np.ndarray] = None
+    _chroma_stft: Optional[np.ndarray] = None
+    _onset_envelope: Optional[np.ndarray] = None
+    _cqt_tuning: Optional[float] = None
+    tuning_given = tuning is not None
+
+    def _ensure_spectrogram() -> np.ndarray:
+        # Shared |STFT(y)| for the key/spectral/mfcc/chroma extractors. On a
+        # GPU the device copy is kept too so MFCC never leaves the device.
+        nonlocal _spectrogram, _spectrogram_gpu
+        if _spectrogram is None:
+            if resolve_device(device) == 'cuda':
+                _spectrogram_gpu = stft_magnitude_torch(y, hop_length=hop_length)
+                _spectrogram = _spectrogram_gpu.cpu().numpy()
+            else:
+                _spectrogram = np.abs(librosa.stft(y, hop_length=hop_length))
+        return _spectrogram
+
+    def _ensure_power() -> np.ndarray:
+        # |STFT|**2 is a full spectrogram-sized array; square it once for the
+        # tuning estimate, STFT chroma and the mel filterbank
+        nonlocal _power
+        if _power is None:
+            _power = np.square(_ensure_spectrogram())
+        return _power
+
+    def _prepare_mfcc() -> None:
+        _ensure_spectrogram()
+        if _spectrogram_gpu is None:
+            _ensure_power()
+
+    def _mfcc_task() -> Dict[str, Any]:
+        if _spectrogram_gpu is not None:
+            return extract_mfcc_torch(_spectrogram_gpu, sr)
+        return extract_mfcc(y, sr, power=_power)
+
+    def _ensure_tuning() -> float:
+        # One pitch-tracking pass shared by STFT chroma and the key
+        nonlocal tuning
+        if tuning is None:
+            tuning = float(librosa.estimate_tuning(S=_ensure_power(), sr=sr, bins_per_octave=12))
+        return tuning
+
+    def _ensure_cqt_tuning() -> float:
+        # CQT/CENS correct tuning at their own 36-bin resolution, which a
+        # semitone estimate cannot stand in for; estimate it as librosa.cqt
+        # would (from |STFT|) but on the shared spectrogram. Returned in
+        # semitones, like a user-supplied --tuning, for cqt_magnitude.
+        nonlocal _cqt_tuning
+        if _cqt_tuning is None:
+            if tuning_given:
+                _cqt_tuning = tuning
+            else:
+                _cqt_tuning = float(librosa.estimate_tuning(
+                    S=_ensure_spectrogram(), sr=sr, bins_per_octave=CHROMA_CQT_BINS_PER_OCTAVE
+                )) * 12 / CHROMA_CQT_BINS_PER_OCTAVE
+        return _cqt_tuning
+
+    def _ensure_chroma_stft() -> np.ndarray:
+        # extract_key and extract_chroma both reduce the same STFT chromagram
+        nonlocal _chroma_stft
+        if _chroma_stft is None:
+            _chroma_stft = librosa.feature.chroma_stft(
+                S=_ensure_power(), sr=sr, tuning=_ensure_tuning()
+            )
+        return _chroma_stft
+
+    def _ensure_onset_envelope() -> np.ndarray:
+        # Beat tracking and transient detection read the same envelope
+        nonlocal _onset_envelope
+        if _onset_envelope is None:
+            _onset_envelope = librosa.onset.onset_strength(y=y, sr=sr, hop_length=hop_length)
+        return _onset_envelope
 
     def _ensure_tempo() -> None:
         nonlocal _tempo_data, _beat_times
         if _tempo_data is not None:
             return
-        _tempo_data = extract_tempo(y, sr)
+        _tempo_data = extract_tempo(y, sr, hop_length=hop_length, onset_envelope=_ensure_onset_envelope())
         _beat_times = np.array(_tempo_data["beats"])
 
     def _ensure_structure() -> None:
+        # Structure, loop points and arrangement share one context so the
+        # chroma/RMS/centroid matrices and the bar grid are built once
         nonlocal _structure_data, _segments, _bar_times, _beats_per_bar
         if _structure_data is not None:
             return
         _ensure_tempo()
         assert _beat_times is not None
-        _structure_data = extract_structure(y, sr, _beat_times)
+        _context.beat_times = _beat_times
+        _structure_data = extract_structure(y, sr, _beat_times, ctx=_context)
         _segments = _structure_data["segments"]
         _bar_times = np.array(_structure_data["bar_times"])
         _beats_per_bar = _structure_data["time_signature"]["beats_per_bar"]
 
+    def _ensure_markers() -> List[Dict[str, Any]]:
+        # arrangement and auto_cues report the same detector output
+        nonlocal _markers
+        if _markers is None:
+            _ensure_structure()
+            assert _beat_times is not None and _segments is not None
+            _markers = extract_arrangement_markers(y, sr, _beat_times, _segments, ctx=_context)
+        return _markers
+
     # -----------------------------------------------------------------------
     # Original features
+    #
+    # These are independent of each other and spend most of their time in
+    # NumPy/FFT code, so they run concurrently. Shared intermediates are
+    # materialised up front so worker threads only ever read them.
     # -----------------------------------------------------------------------
-    if extract_all or 'tempo' in features:
+    def _tempo_task() -> Dict[str, Any]:
         _ensure_tempo()
         assert _tempo_data is not None
-        results.update(_tempo_data)
+        return _tempo_data
+
+    # Dispatch plan: feature -> (shared intermediate to build first, task).
+    # Dict order is the order results are merged in.
+    plan: Dict[str, Tuple[Optional[Callable[[], Any]], Callable[[], Dict[str, Any]]]] = {
+        'tempo': (_ensure_onset_envelope, _tempo_task),
+        'key': (_ensure_chroma_stft, lambda: extract_key(y, sr, chromagram=_chroma_stft)),
+        'energy': (None, lambda: extract_energy(y, sr, hop_length=hop_length)),
+        'spectral': (_ensure_spectrogram, lambda: extract_spectral(y, sr, S=_spectrogram)),
+        'mfcc': (_prepare_mfcc, _mfcc_task),
+    }
+    # STFT chroma is its own task so it does not wait on the CQT; CQT and
+    # CENS share one constant-Q transform and so run as a single task
+    chroma_variants = parse_chroma_variants(features)
+    cqt_variants = tuple(v for v in chroma_variants if v != 'stft')
+    if 'stft' in chroma_variants:
+        plan['chroma:stft'] = (
+            _ensure_chroma_stft,
+            lambda: extract_chroma(y, sr, chromagram=_chroma_stft, variants=('stft',), tuning=tuning)
+        )
+    if cqt_variants:
+        plan['chroma:cqt'] = (
+            _ensure_cqt_tuning,
+            lambda: extract_chroma(y, sr, variants=cqt_variants, tuning=_cqt_tuning)
+        )
 
-    if extract_all or 'key' in features:
-        results.update(extract_key(y, sr))
+    targets = [
+        name for name in plan
+        if name.startswith('chroma:') or extract_all or name in wanted
+    ]
+    for name in targets:
+        prepare = plan[name][0]
+        if prepare is not None:
+            prepare()
 
-    if extract_all or 'energy' in features:
-        results.update(extract_energy(y, sr))
+    for task_result in _run_concurrently([plan[name][1] for name in targets]):
+        results.update(task_result)
 
-    if extract_all or 'spectral' in features:
-        results.update(extract_spectral(y, sr))
+    # -----------------------------------------------------------------------
+    # Later stages
+    #
+    # Structure -> loop points -> arrangement -> auto cues is one dependency
+    # chain sharing the analysis context; the energy curve and transient
+    # stages need neither it nor each other, so all three run concurrently.
+    # -----------------------------------------------------------------------
+    def _structure_stage() -> Dict[str, Any]:
+        stage: Dict[str, Any] = {}
+
+        # -------------------------------------------------------------------
+        # US-001: Structure
+        # -------------------------------------------------------------------
+        if extract_all or 'structure' in wanted:
+            _ensure_structure()
+            assert _structure_data is not None
+            stage["structure"] = _structure_data
+            # Also ensure tempo is in results (auto-dependency)
+            if "tempo" not in results and _tempo_data is not None:
+                stage.update(_tempo_data)
+
+        # -------------------------------------------------------------------
+        # US-002: Loop Points (depends on structure)
+        # -------------------------------------------------------------------
+        if extract_all or 'loop_points' in wanted:
+            _ensure_structure()
+            assert _beat_times is not None and _segments is not None
+            stage["loop_points"] = extract_loop_points(
+                y, sr, _beat_times, _segments,
+                bar_times=_bar_times, beats_per_bar=_beats_per_bar, ctx=_context
+            )
+
+        # -------------------------------------------------------------------
+        # US-003: Arrangement Markers (depends on tempo + structure)
+        # -------------------------------------------------------------------
+        if extract_all or 'arrangement' in wanted:
+            stage["arrangement_markers"] = _ensure_markers()
+
+        # -------------------------------------------------------------------
+        # US-003b: Auto Cues (arrangement markers formatted as cue points)
+        # -------------------------------------------------------------------
+        if extract_all or 'auto_cues' in wanted:
+            raw_markers = _ensure_markers()
+
+            # Also include structure segment boundaries as cue candidates
+            cue_color_map = {
+                "key_change": "#9B59B6",   # purple
+                "energy_rise": "#E74C3C",  # red
+                "energy_drop": "#3498DB",  # blue
+                "drop": "#F39C12",         # orange
+                "build_up": "#2ECC71",     # green
+                "intro": "#1ABC9C",        # teal
+                "verse": "#2980B9",        # dark blue
+                "chorus": "#E91E63",       # pink
+                "bridge": "#FF9800",       # amber
+                "outro": "#607D8B",        # grey
+            }
 
-    if extract_all or 'mfcc' in features:
-        results.update(extract_mfcc(y, sr))
+            auto_cues = []
+            # Convert arrangement markers to cue points
+            for marker in raw_markers:
+                cue_type = marker.get("marker_type", "unknown")
+                color = cue_color_map.get(cue_type, "#95A5A6")
+                confidence = marker.get("intensity", 0.5)
+                # Use metadata confidence if available (e.g. key_change)
+                if "metadata" in marker and "confidence" in marker["metadata"]:
+                    confidence = marker["metadata"]["confidence"]
+                auto_cues.append({
+                    "position_ms": marker["position_ms"],
+                    "label": marker.get("description", cue_type),
+                    "cue_type": cue_type,
+                    "color": color,
+                    "confidence": round(float(confidence), 4),
+                })
 
-    if extract_all or 'chroma' in features:
-        results.update(extract_chroma(y, sr))
+            # Add structure segment boundaries as cues
+            if _segments:
+                for seg in _segments:
+                    seg_type = seg.get("label", "unknown").lower()
+                    color = cue_color_map.get(seg_type, "#95A5A6")
+                    auto_cues.append({
+                        "position_ms": int(seg.get("start_ms", seg.get("start", 0) * 1000)),
+                        "label": f"{seg.get('label', 'Section')} start",
+                        "cue_type": seg_type,
+                        "color": color,
+                        "confidence": round(float(seg.get("confidence", 0.7)), 4),
+                    })
 
-    # -----------------------------------------------------------------------
-    # US-001: Structure
-    # -----------------------------------------------------------------------
-    if extract_all or 'structure' in features:
-        _ensure_structure()
-        assert _structure_data is not None
-        results["structure"] = _structure_data
-        # Also ensure tempo is in results (auto-dependency)
-        if "tempo" not in results and _tempo_data is not None:
-            results.update(_tempo_data)
+            # Deduplicate: keep highest confidence when cues are within 500ms
+            stage["auto_cues"] = dedupe_cues(auto_cues)
+        return stage
+
+    def _energy_curve_stage() -> Dict[str, Any]:
+        stage: Dict[str, Any] = {}
+
+        # -------------------------------------------------------------------
+        # US-004: Energy Curve
+        # -------------------------------------------------------------------
+        if extract_all or 'energy_curve' in wanted:
+            stage["energy_curve"] = extract_energy_curve(y, sr, ctx=_context)
+        return stage
+
+    def _transients_stage() -> Dict[str, Any]:
+        stage: Dict[str, Any] = {}
+
+        # -------------------------------------------------------------------
+        # US-006/US-007: Transient detection + Drum category classification
+        # -------------------------------------------------------------------
+        if extract_all or 'transients' in wanted or 'drum_events' in wanted:
+            transients = detect_transients(
+                y, sr, hop_length=hop_length, onset_envelope=_onset_envelope
+            )
+            stage["transient_times"] = transients["transient_times"]
+            stage["onset_strength_mean"] = transients["onset_strength_mean"]
+            stage["percussive_ratio"] = transients["percussive_ratio"]
+
+            drum_events = classify_transients(y, sr, transients["transient_times"])
+            stage["drum_events"] = drum_events
+
+            # Compute 2D MFCC embedding for scatter graph (one-shots primarily)
+            if duration < 8.0:
+                stage["mfcc_embedding"] = compute_mfcc_embedding(y, sr)
+        return stage
+
+    stage_features = (
+        (_structure_stage, {'structure', 'loop_points', 'arrangement', 'auto_cues'}),
+        (_energy_curve_stage, {'energy_curve'}),
+        (_transients_stage, {'transients', 'drum_events'}),
+    )
+    stages = [stage for stage, names in stage_features if extract_all or wanted & names]
+    if _transients_stage in stages:
+        _ensure_onset_envelope()
+    for stage_result in _run_concurrently(stages):
+        results.update(stage_result)
 
-    # -----------------------------------------------------------------------
-    # US-002: Loop Points (depends on structure)
-    # -----------------------------------------------------------------------
-    if extract_all or 'loop_points' in features:
-        _ensure_structure()
-        assert _beat_times is not None and _segments is not None
-        results["loop_points"] = extract_loop_points(
-            y, sr, _beat_times, _segments,
-            bar_times=_bar_times, beats_per_bar=_beats_per_bar
-        )
+    return results
 
-    # -----------------------------------------------------------------------
-    # US-003: Arrangement Markers (depends on tempo + structure)
-    # -----------------------------------------------------------------------
-    if extract_all or 'arrangement' in features:
-        _ensure_structure()
-        assert _beat_times is not None and _segments is not None
-        results["arrangement_markers"] = extract_arrangement_markers(
-            y, sr, _beat_times, _segments
-        )
 
-    # -----------------------------------------------------------------------
-    # US-003b: Auto Cues (arrangement markers formatted as cue points)
-    # -----------------------------------------------------------------------
-    if extract_all or 'auto_cues' in features:
-        _ensure_structure()
-        assert _beat_times is not None and _segments is not None
-        raw_markers = extract_arrangement_markers(y, sr, _beat_times, _segments)
-
-        # Also include structure segment boundaries as cue candidates
-        cue_color_map = {
-            "key_change": "#9B59B6",   # purple
-            "energy_rise": "#E74C3C",  # red
-            "energy_drop": "#3498DB",  # blue
-            "drop": "#F39C12",         # orange
-            "build_up": "#2ECC71",     # green
-            "intro": "#1ABC9C",        # teal
-            "verse": "#2980B9",        # dark blue
-            "chorus": "#E91E63",       # pink
-            "bridge": "#FF9800",       # amber
-            "outro": "#607D8B",        # grey
-        }
+def _json_default(obj: Any) -> Any:
+    """json fallback for NumPy arrays and scalars (orjson handles them natively)."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
 
-        auto_cues = []
-        # Convert arrangement markers to cue points
-        for marker in raw_markers:
-            cue_type = marker.get("marker_type", "unknown")
-            color = cue_color_map.get(cue_type, "#95A5A6")
-            confidence = marker.get("intensity", 0.5)
-            # Use metadata confidence if available (e.g. key_change)
-            if "metadata" in marker and "confidence" in marker["metadata"]:
-                confidence = marker["metadata"]["confidence"]
-            auto_cues.append({
-                "position_ms": marker["position_ms"],
-                "label": marker.get("description", cue_type),
-                "cue_type": cue_type,
-                "color": color,
-                "confidence": round(float(confidence), 4),
-            })
 
-        # Add structure segment boundaries as cues
-        if _segments:
-            for seg in _segments:
-                seg_type = seg.get("label", "unknown").lower()
-                color = cue_color_map.get(seg_type, "#95A5A6")
-                auto_cues.append({
-                    "position_ms": int(seg.get("start_ms", seg.get("start", 0) * 1000)),
-                    "label": f"{seg.get('label', 'Section')} start",
-                    "cue_type": seg_type,
-                    "color": color,
-                    "confidence": round(float(seg.get("confidence", 0.7)), 4),
-                })
+def dump_json(obj: Any, pretty: bool = False) -> bytes:
+    """Serialise analysis results, including NumPy values, to UTF-8 JSON."""
+    if HAS_ORJSON:
+        option = orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if pretty else None, default=_json_default).encode()
 
-        # Deduplicate: keep highest confidence when cues are within 500ms
-        auto_cues.sort(key=lambda c: c["position_ms"])
-        deduped: List[Dict[str, Any]] = []
-        for cue in auto_cues:
-            if deduped and abs(cue["position_ms"] - deduped[-1]["position_ms"]) < 500:
-                if cue["confidence"] > deduped[-1]["confidence"]:
-                    deduped[-1] = cue
-            else:
-                deduped.append(cue)
 
-        results["auto_cues"] = deduped
+def load_json(data: bytes) -> Any:
+    """Parse a UTF-8 JSON document (a cached result or a --daemon request)."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
 
-    # -----------------------------------------------------------------------
-    # US-004: Energy Curve
-    # -----------------------------------------------------------------------
-    if extract_all or 'energy_curve' in features:
-        results["energy_curve"] = extract_energy_curve(y, sr)
 
-    # -----------------------------------------------------------------------
-    # US-006/US-007: Transient detection + Drum category classification
-    # -----------------------------------------------------------------------
-    if extract_all or 'transients' in features or 'drum_events' in features:
-        transients = detect_transients(y, sr)
-        results["transient_times"] = transients["transient_times"]
-        results["onset_strength_mean"] = transients["onset_strength_mean"]
-        results["percussive_ratio"] = transients["percussive_ratio"]
+def write_json(obj: Any, pretty: bool = False) -> None:
+    """Write one JSON document plus newline to stdout in a single write."""
+    sys.stdout.buffer.write(dump_json(obj, pretty) + b'\n')
+    sys.stdout.buffer.flush()
+
+
+CACHE_SAMPLE_BYTES = 1 << 20
+
+
+def _default_cache_dir() -> str:
+    """Per-user cache directory: $XDG_CACHE_HOME/sfa-analyzer (~/.cache by default)."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sfa-analyzer')
+
+
+@functools.lru_cache(maxsize=None)
+def _librosa_version() -> str:
+    """Installed librosa version, read from package metadata without importing it."""
+    try:
+        return importlib.metadata.version('librosa')
+    except importlib.metadata.PackageNotFoundError:
+        return 'unknown'
+
 
-        drum_events = classify_transients(y, sr, transients["transient_times"])
-        results["drum_events"] = drum_events
+def _content_digest(audio_path: str) -> str:
+    """SHA-256 of a file's size plus its first and last CACHE_SAMPLE_BYTES.
 
-        # Compute 2D MFCC embedding for scatter graph (one-shots primarily)
-        if duration < 8.0:
-            results["mfcc_embedding"] = compute_mfcc_embedding(y, sr)
+    Identifies the audio by content rather than by path or mtime, so renamed,
+    copied or re-downloaded files still hit the cache, while re-encodes and
+    tag edits (ID3v2 at the head, ID3v1/APE at the tail) do not.
+    """
+    size = os.path.getsize(audio_path)
+    digest = hashlib.sha256(struct.pack('<Q', size))
+    with open(audio_path, 'rb') as f:
+        digest.update(f.read(CACHE_SAMPLE_BYTES))
+        if size > 2 * CACHE_SAMPLE_BYTES:
+            f.seek(-CACHE_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(CACHE_SAMPLE_BYTES))
+        elif size > CACHE_SAMPLE_BYTES:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _cache_key(audio_path: str, features: List[str], options: Dict[str, Any]) -> str:
+    """Cache key for an analysis: file content, features, options and library versions."""
+    ident = (
+        f"{_content_digest(audio_path)}:{sorted(set(features))}:"
+        f"{sorted(options.items())}:{ANALYSIS_VERSION}:{_librosa_version()}"
+    )
+    return hashlib.sha1(ident.encode()).hexdigest()
+
+
+def analyze_audio_cached(
+    audio_path: str,
+    features: List[str],
+    cache_dir: Optional[str] = None,
+    regenerate: bool = False,
+    **options: Any
+) -> Dict[str, Any]:
+    """Run analyze_audio through an on-disk JSON cache.
+
+    Results are stored as ``<cache_dir>/<key>.json`` where the key hashes the
+    file's content (see _content_digest), the requested features, the
+    analysis options and the analyzer/librosa versions, so replacing the file
+    or upgrading librosa invalidates its entries.
+
+    Args:
+        audio_path: Path to audio file
+        features: List of features to extract
+        cache_dir: Cache directory (caching is disabled when None)
+        regenerate: Ignore any cached entry and overwrite it
+        **options: Keyword arguments for analyze_audio (sample_rate, ...)
+
+    Returns:
+        Dictionary containing all extracted features
+    """
+    if cache_dir is None or not os.path.exists(audio_path):
+        return analyze_audio(audio_path, features, **options)
+
+    cache_path = os.path.join(cache_dir, f"{_cache_key(audio_path, features, options)}.json")
+    if not regenerate:
+        try:
+            with open(cache_path, 'rb') as f:
+                return load_json(f.read())
+        except (OSError, ValueError):
+            pass
+
+    results = analyze_audio(audio_path, features, **options)
+
+    # Write atomically so a concurrent reader never sees a partial entry;
+    # a cache that cannot be written is not an analysis failure
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dump_json(results))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
 
     return results
 
 
+def warmup() -> None:
+    """JIT-compile numba code paths into NUMBA_CACHE_DIR.
+
+    Runs the beat tracker and each of our kernels, through the same callers
+    and argument types as a real analysis, on a short synthetic signal so
+    later processes load compiled code from the cache instead of paying the
+    compile cost on their first track.
+    """
+    sr = DEFAULT_SAMPLE_RATE
+    y = (np.random.default_rng(0).standard_normal(sr * 4) * 0.1).astype(np.float32)
+    extract_tempo(y, sr)
+    extract_energy(y, sr)
+    extract_spectral(y, sr)
+    # detect_drops / detect_buildups pass float64 window RMS and bandwidth
+    rms = np.abs(y[:64]).astype(np.float64)
+    _scan_drops(rms, float(rms.mean()))
+    _scan_rising_runs(rms, rms, 4)
+
+
+def _error_payload(e: Exception) -> Dict[str, Any]:
+    """Map an analysis exception to the JSON error shape the CLI reports."""
+    if isinstance(e, FileNotFoundError):
+        return {"error": "File not found", "message": str(e)}
+    if isinstance(e, ValueError):
+        return {"error": "Invalid audio file", "message": str(e)}
+    return {"error": "Analysis failed", "message": str(e), "type": type(e).__name__}
+
+
+def _init_batch_worker(threads: int) -> None:
+    """Pool initializer: one BLAS thread and ``threads`` extractor threads per worker process."""
+    global _extractor_threads
+    _extractor_threads = threads
+    if HAS_THREADPOOLCTL:
+        threadpool_limits(limits=1)
+
+
+def _analyze_one(job: Tuple[str, List[str], Dict[str, Any]]) -> Dict[str, Any]:
+    """Batch worker: analyze one file, returning results or an error payload."""
+    audio_path, features, options = job
+    try:
+        results = analyze_audio_cached(audio_path, features, **options)
+    except Exception as e:
+        return {"file": audio_path, **_error_payload(e)}
+    return {"file": audio_path, **results}
+
+
+def analyze_batch(
+    audio_paths: List[str],
+    features: List[str],
+    jobs: Optional[int] = None,
+    **options: Any
+) -> Iterator[Dict[str, Any]]:
+    """Analyze many files across a process pool.
+
+    Imports and numba compilation are paid once per worker rather than once
+    per file. Results are yielded as they complete (not in input order), each
+    tagged with its ``file``; failures yield an error payload instead of
+    raising. ``options`` are passed through to analyze_audio_cached.
+    """
+    # Compile once rather than racing to do it in every worker, but in a
+    # throwaway child: the parallel kernel starts numba's threading pool,
+    # and forking the pool from a process that has one hangs with TBB
+    warm = multiprocessing.Process(target=warmup)
+    warm.start()
+    warm.join()
+
+    work = [(path, features, options) for path in audio_paths]
+    processes = max(1, min(jobs or os.cpu_count() or 1, len(work)))
+    threads = max(1, (os.cpu_count() or 1) // processes)
+    with multiprocessing.Pool(
+        processes=processes, initializer=_init_batch_worker, initargs=(threads,)
+    ) as pool:
+        yield from pool.imap_unordered(_analyze_one, work)
+
+
+VALID_FEATURES = frozenset({
+    'tempo', 'key', 'energy', 'spectral', 'mfcc', 'chroma',
+    'structure', 'loop_points', 'arrangement', 'energy_curve',
+    'auto_cues', 'all'
+} | {f'chroma:{v}' for v in CHROMA_VARIANTS})
+
+
+def _parse_features(spec: str) -> List[str]:
+    """Split a comma-separated --features value."""
+    return [f.strip() for f in spec.split(',')]
+
+
+def _invalid_features(features: List[str]) -> Set[str]:
+    """Requested features that the analyzer does not know."""
+    return {
+        f for f in features
+        if f not in VALID_FEATURES
+        # chroma variants may be combined, e.g. chroma:stft+cqt
+        and not (f.startswith('chroma:') and set(f[7:].split('+')) <= set(CHROMA_VARIANTS))
+    }
+
+
+def _invalid_features_payload(invalid: Set[str]) -> Dict[str, Any]:
+    return {
+        "error": "Invalid features",
+        "invalid": sorted(invalid),
+        "valid": sorted(VALID_FEATURES)
+    }
+
+
+def serve(features: List[str], **options: Any) -> None:
+    """Analyze files named on stdin, one JSON result per line on stdout.
+
+    Each input line is either a bare path, analyzed with ``features``, or a
+    JSON object ``{"file": path, "features": "tempo,key" | [...]}``. Results
+    carry their ``file`` like batch mode, and failures are reported as an
+    error payload on the same line instead of ending the process, so one
+    long-lived worker pays the librosa/numba startup cost once for every
+    file it is sent. Returns at end of input.
+    """
+    warmup()
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                request = load_json(line)
+                audio_path = request["file"]
+                wanted = request.get("features", features)
+                if isinstance(wanted, str):
+                    wanted = _parse_features(wanted)
+                wanted = [str(f).strip() for f in wanted]
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                write_json({"error": "Invalid request", "message": str(e)})
+                continue
+        else:
+            audio_path, wanted = line, features
+
+        invalid = _invalid_features(wanted)
+        if invalid:
+            write_json({"file": audio_path, **_invalid_features_payload(invalid)})
+            continue
+        write_json(_analyze_one((audio_path, wanted, options)))
+
+
 def main():
     """
     Main entry point for audio analyzer
@@ -1404,12 +2810,26 @@ Examples:
   %(prog)s /path/to/audio.mp3 --features all --output json
   %(prog)s /path/to/audio.mp3 --features tempo --output pretty
   %(prog)s /path/to/audio.mp3 --features structure,loop_points,arrangement,energy_curve
+  %(prog)s /path/to/audio.mp3 --features key,chroma:stft+cqt
+  %(prog)s /path/to/audio.mp3 --features all --cache-dir /tmp/sfa-analysis
+  %(prog)s /path/to/audio.mp3 --features tempo,energy --preset fast
+  %(prog)s a.mp3 b.mp3 c.mp3 --features tempo,key --jobs 4   (NDJSON, one line per file)
+  %(prog)s --warmup
+  %(prog)s --daemon --features tempo,key < paths.txt   (NDJSON, one line per input line)
         """
     )
 
     parser.add_argument(
         'audio_file',
-        help='Path to audio file to analyze'
+        nargs='*',
+        help='Path to audio file to analyze (several files switch to batch NDJSON output)'
+    )
+
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='Worker processes for batch mode (default: CPU count)'
     )
 
     parser.add_argument(
@@ -1426,58 +2846,139 @@ Examples:
         help='Output format (default: json)'
     )
 
+    parser.add_argument(
+        '--sample-rate',
+        type=int,
+        default=DEFAULT_SAMPLE_RATE,
+        help=f'Resample sources above this rate before analysis; 0 keeps the source rate (default: {DEFAULT_SAMPLE_RATE})'
+    )
+
+    parser.add_argument(
+        '--analysis-hop',
+        type=int,
+        default=None,
+        help='Frame hop for tempo, energy and STFT features (default: 512)'
+    )
+
+    parser.add_argument(
+        '--preset',
+        choices=sorted(ANALYSIS_PRESETS),
+        default='balanced',
+        help='Speed/resolution shorthand: fast=hop 1024, balanced=512, accurate=256 '
+             '(--analysis-hop overrides)'
+    )
+
+    parser.add_argument(
+        '--tuning',
+        type=lambda v: None if v == 'auto' else float(v),
+        default=None,
+        help="Chroma tuning offset in bins: 'auto' estimates it, 0 assumes A440 "
+             "and skips estimation (default: auto)"
+    )
+
+    parser.add_argument(
+        '--device',
+        choices=['auto', 'cuda', 'cpu'],
+        default='auto',
+        help='Where to compute the STFT/MFCC: cuda needs torch + torchaudio '
+             '(default: auto, GPU when available)'
+    )
+
+    parser.add_argument(
+        '--max-duration',
+        type=float,
+        default=None,
+        metavar='SECONDS',
+        help='Analyze only the first SECONDS of each file to bound memory '
+             '(default: whole file)'
+    )
+
+    parser.add_argument(
+        '--stream',
+        action='store_const',
+        const=True,
+        default=None,
+        help='Analyze in blocks to bound memory (automatic above 100 MB; '
+             'only key, energy, spectral, mfcc and STFT chroma support it)'
+    )
+
+    parser.add_argument(
+        '--cache-dir',
+        nargs='?',
+        const=_default_cache_dir(),
+        help='Directory for cached analysis results; without a value uses '
+             '$XDG_CACHE_HOME/sfa-analyzer (default: no caching)'
+    )
+
+    parser.add_argument(
+        '--cache-regenerate',
+        action='store_true',
+        help='Recompute and overwrite any cached result'
+    )
+
+    parser.add_argument(
+        '--warmup',
+        action='store_true',
+        help='Populate the numba compile cache and exit (e.g. at image build time)'
+    )
+
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Read paths (or {"file", "features"} JSON objects) from stdin, one '
+             'per line, and answer each with one JSON line until end of input'
+    )
+
     args = parser.parse_args()
 
+    if args.warmup:
+        warmup()
+        sys.exit(0)
+    if not args.audio_file and not args.daemon:
+        parser.error('the following arguments are required: audio_file')
+
     # Parse features
-    features = [f.strip() for f in args.features.split(',')]
+    features = _parse_features(args.features)
 
-    # Validate features
-    valid_features = {
-        'tempo', 'key', 'energy', 'spectral', 'mfcc', 'chroma',
-        'structure', 'loop_points', 'arrangement', 'energy_curve',
-        'auto_cues', 'all'
-    }
-    invalid_features = set(features) - valid_features
+    invalid_features = _invalid_features(features)
     if invalid_features:
-        print(json.dumps({
-            "error": "Invalid features",
-            "invalid": list(invalid_features),
-            "valid": sorted(list(valid_features))
-        }), file=sys.stderr)
+        print(json.dumps(_invalid_features_payload(invalid_features)), file=sys.stderr)
         sys.exit(1)
 
+    options = {
+        "sample_rate": args.sample_rate or None,
+        "stream": args.stream,
+        "hop_length": args.analysis_hop or ANALYSIS_PRESETS[args.preset],
+        "tuning": args.tuning,
+        "device": args.device,
+        "max_duration": args.max_duration,
+        "cache_dir": args.cache_dir,
+        "regenerate": args.cache_regenerate,
+    }
+
+    if args.daemon:
+        serve(features, **options)
+        sys.exit(0)
+
+    if len(args.audio_file) > 1:
+        # Batch mode: one JSON object per line, as each file finishes
+        failed = False
+        for result in analyze_batch(args.audio_file, features, jobs=args.jobs, **options):
+            failed = failed or "error" in result
+            write_json(result)
+        sys.exit(1 if failed else 0)
+
     try:
         # Analyze audio
-        results = analyze_audio(args.audio_file, features)
+        results = analyze_audio_cached(args.audio_file[0], features, **options)
 
         # Output results
-        if args.output == 'json':
-            print(json.dumps(results))
-        else:  # pretty
-            print(json.dumps(results, indent=2))
+        write_json(results, pretty=args.output == 'pretty')
 
         sys.exit(0)
 
-    except FileNotFoundError as e:
-        print(json.dumps({
-            "error": "File not found",
-            "message": str(e)
-        }), file=sys.stderr)
-        sys.exit(1)
-
-    except ValueError as e:
-        print(json.dumps({
-            "error": "Invalid audio file",
-            "message": str(e)
-        }), file=sys.stderr)
-        sys.exit(1)
-
     except Exception as e:
-        print(json.dumps({
-            "error": "Analysis failed",
-            "message": str(e),
-            "type": type(e).__name__
-        }), file=sys.stderr)
+        print(json.dumps(_error_payload(e)), file=sys.stderr)
         sys.exit(1)
 
 
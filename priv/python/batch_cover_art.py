@@ -5,31 +5,136 @@ Batch fetch album art for Spotify tracks using oEmbed API.
 Reads track IDs from a file (first argument), fetches album art URLs
 from Spotify's public oEmbed endpoint, outputs JSON mapping {track_id: cover_url}.
 
-No API credentials needed.
+No API credentials needed. Resolved URLs are cached for 30 days in
+$XDG_CACHE_HOME/sfa/coverart.sqlite (~/.cache by default).
 """
 
+import os
 import sys
 import json
+import time
+import sqlite3
+import threading
+import http.client
 import concurrent.futures
-from urllib.request import urlopen, Request
+
+OEMBED_HOST = "open.spotify.com"
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAX_RETRIES = 3
+
+# Resolved cover URLs are cached on disk so repeat runs skip the network
+CACHE_TTL_SECONDS = 30 * 24 * 3600
+CACHE_COMMIT_EVERY = 100
+
+# One keep-alive connection per worker thread, so the TLS handshake is paid
+# once per thread instead of once per track
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPSConnection(OEMBED_HOST, timeout=10)
+    return conn
+
+
+def _get_json(path):
+    """GET a JSON document from the oEmbed host, retrying 429/5xx with backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        delay = 0.5 * 2 ** attempt
+        conn = _connection()
+        try:
+            conn.request("GET", path, headers=HEADERS)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            # Stale keep-alive socket or network error: reconnect on retry
+            conn.close()
+            _local.conn = None
+            if attempt == MAX_RETRIES:
+                raise
+            time.sleep(delay)
+            continue
+
+        if resp.status == 429 or resp.status >= 500:
+            if attempt == MAX_RETRIES:
+                raise RuntimeError(f"HTTP {resp.status}")
+            retry_after = resp.getheader("Retry-After", "")
+            time.sleep(min(int(retry_after), 30) if retry_after.isdigit() else delay)
+            continue
+        if resp.status != 200:
+            raise RuntimeError(f"HTTP {resp.status}")
+        return json.loads(body)
 
 
 def fetch_cover_art(track_id):
     """Fetch album art URL from Spotify oEmbed API."""
-    url = f"https://open.spotify.com/oembed?url=spotify:track:{track_id}"
     try:
-        req = Request(url, headers={"User-Agent": "Mozilla/5.0"})
-        with urlopen(req, timeout=10) as resp:
-            data = json.loads(resp.read())
-            thumbnail = data.get("thumbnail_url")
-            if thumbnail:
-                return track_id, thumbnail
+        data = _get_json(f"/oembed?url=spotify:track:{track_id}")
+        thumbnail = data.get("thumbnail_url")
+        if thumbnail:
+            return track_id, thumbnail
         return track_id, None
     except Exception as e:
         print(json.dumps({"warning": f"Failed for {track_id}: {str(e)}"}), file=sys.stderr, flush=True)
         return track_id, None
 
 
+def _cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sfa", "coverart.sqlite")
+
+
+def open_cache():
+    """Open the cover-art cache, or return None when it cannot be created."""
+    path = _cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = sqlite3.connect(path)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS coverart "
+            "(track_id TEXT PRIMARY KEY, url TEXT NOT NULL, fetched_at INTEGER NOT NULL)"
+        )
+        return db
+    except (OSError, sqlite3.Error) as e:
+        print(json.dumps({"warning": f"Cover art cache disabled: {str(e)}"}), file=sys.stderr, flush=True)
+        return None
+
+
+def cached_covers(db, track_ids):
+    """Return {track_id: url} for cached entries younger than CACHE_TTL_SECONDS."""
+    cutoff = int(time.time()) - CACHE_TTL_SECONDS
+    found = {}
+    try:
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(track_ids), 500):
+            chunk = track_ids[i:i + 500]
+            rows = db.execute(
+                f"SELECT track_id, url FROM coverart WHERE fetched_at >= ? "
+                f"AND track_id IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk],
+            )
+            found.update(rows)
+    except sqlite3.Error as e:
+        print(json.dumps({"warning": f"Cover art cache read failed: {str(e)}"}), file=sys.stderr, flush=True)
+    return found
+
+
+def close_cache(db, error=None):
+    """Close the cache, reporting ``error`` if it is being abandoned.
+
+    Always returns None, so a failed cache can be dropped with
+    ``db = close_cache(db, e)`` and the run continues without it.
+    """
+    if error is not None:
+        print(json.dumps({"warning": f"Cover art cache disabled: {str(error)}"}), file=sys.stderr, flush=True)
+    try:
+        db.close()
+    except sqlite3.Error:
+        pass
+    return None
+
+
 def main():
     if len(sys.argv) < 2:
         print(json.dumps({"error": "Usage: batch_cover_art.py <ids_file>"}), flush=True)
@@ -42,18 +147,44 @@ def main():
         print(json.dumps({}), flush=True)
         return
 
-    print(json.dumps({"status": f"Fetching cover art for {len(track_ids)} tracks..."}), file=sys.stderr, flush=True)
+    db = open_cache()
+    updates = cached_covers(db, track_ids) if db is not None else {}
+    pending = [tid for tid in track_ids if tid not in updates]
 
-    updates = {}
+    print(json.dumps({"status": f"Fetching cover art for {len(pending)} tracks ({len(updates)} cached)..."}), file=sys.stderr, flush=True)
+
+    uncommitted = 0
     # Use thread pool for concurrent fetches (5 at a time to be polite)
     with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(fetch_cover_art, tid): tid for tid in track_ids}
+        futures = {executor.submit(fetch_cover_art, tid): tid for tid in pending}
         for i, future in enumerate(concurrent.futures.as_completed(futures)):
             track_id, cover_url = future.result()
             if cover_url:
                 updates[track_id] = cover_url
+                if db is not None:
+                    # A locked or corrupt cache must not lose the covers
+                    # already fetched; carry on without it
+                    try:
+                        db.execute(
+                            "INSERT OR REPLACE INTO coverart VALUES (?, ?, ?)",
+                            (track_id, cover_url, int(time.time())),
+                        )
+                        uncommitted += 1
+                        if uncommitted >= CACHE_COMMIT_EVERY:
+                            db.commit()
+                            uncommitted = 0
+                    except sqlite3.Error as e:
+                        db = close_cache(db, e)
             if (i + 1) % 20 == 0:
-                print(json.dumps({"status": f"Processed {i+1}/{len(track_ids)}"}), file=sys.stderr, flush=True)
+                print(json.dumps({"status": f"Processed {i+1}/{len(pending)}"}), file=sys.stderr, flush=True)
+
+    if db is not None:
+        try:
+            db.commit()
+        except sqlite3.Error as e:
+            close_cache(db, e)
+        else:
+            close_cache(db)
 
     print(json.dumps({"status": f"Got cover art for {len(updates)}/{len(track_ids)} tracks"}), file=sys.stderr, flush=True)
     print(json.dumps(updates), flush=True)
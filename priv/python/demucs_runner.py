@@ -9,17 +9,27 @@ Demucs Runner - Stem Separation Wrapper
 @license MIT
 """
 
+import io
 import sys
 import json
-import subprocess
 import os
+import re
 import argparse
+import contextlib
+from collections import deque
 from pathlib import Path
 
+# tqdm redraws its bar with \r, so progress arrives as \r-separated updates
+_LINE_BREAK_RE = re.compile(r'[\r\n]')
+_PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
 
-def emit(data):
-    """Print JSON to stdout with explicit flush for Erlang Port communication."""
-    print(json.dumps(data), flush=True)
+# Lines of Demucs stderr kept for the error report
+STDERR_TAIL_LINES = 20
+
+
+def emit(data, file=None):
+    """Print JSON to stdout (or ``file``) with explicit flush for Erlang Port communication."""
+    print(json.dumps(data), file=file or sys.stdout, flush=True)
 
 
 def emit_error(data):
@@ -27,6 +37,51 @@ def emit_error(data):
     print(json.dumps(data), file=sys.stderr, flush=True)
 
 
+class _ProgressStream(io.TextIOBase):
+    """Text stream standing in for Demucs' stderr while it runs in-process.
+
+    Emits a progress event whenever the percentage in tqdm's output changes
+    and keeps the last STDERR_TAIL_LINES lines for the error report.
+    """
+
+    def __init__(self, port):
+        super().__init__()
+        self.port = port
+        self.tail = deque(maxlen=STDERR_TAIL_LINES)
+        self._last_percent = None
+        self._pending = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        *lines, self._pending = _LINE_BREAK_RE.split(self._pending + text)
+        for line in lines:
+            if line.strip():
+                self.tail.append(line)
+        # tqdm writes "\r<bar>", so the latest bar is the unterminated tail
+        for line in (*lines, self._pending):
+            match = _PERCENT_RE.search(line)
+            if match is None:
+                continue
+            percent = int(float(match.group(1)))
+            # The bar redraws far more often than the percentage changes
+            if percent != self._last_percent:
+                self._last_percent = percent
+                emit({
+                    "type": "progress",
+                    "percent": percent,
+                    "message": f"Processing: {percent}%"
+                }, file=self.port)
+        return len(text)
+
+    def stderr_text(self):
+        lines = list(self.tail)
+        if self._pending.strip():
+            lines.append(self._pending)
+        return "\n".join(lines)
+
+
 def run_demucs(audio_path: str, model: str = "htdemucs", output_dir: str = "/tmp/demucs"):
     """
     Run Demucs stem separation on an audio file
@@ -57,9 +112,17 @@ def run_demucs(audio_path: str, model: str = "htdemucs", output_dir: str = "/tmp
         })
         sys.exit(1)
 
-    # Build Demucs command using the same Python that's running this script
-    cmd = [
-        sys.executable, "-m", "demucs",
+    try:
+        from demucs.separate import main as demucs_main
+    except ImportError:
+        emit_error({
+            "type": "error",
+            "message": "Demucs not found. Please install: pip install demucs"
+        })
+        sys.exit(1)
+
+    # Same arguments as `python -m demucs`
+    demucs_args = [
         "--mp3",           # Output as MP3
         "-n", model,       # Model name
         "-o", output_dir,  # Output directory
@@ -73,54 +136,35 @@ def run_demucs(audio_path: str, model: str = "htdemucs", output_dir: str = "/tmp
         "message": "Starting Demucs stem separation"
     })
 
-    # Run Demucs
+    # Run Demucs in this interpreter: torch is imported once and the decoded
+    # waveform never crosses a pipe. Its stdout chatter must not reach the
+    # Port, and its tqdm progress on stderr is parsed as it is written.
+    port = sys.stdout
+    progress = _ProgressStream(port)
+    exit_code = 0
     try:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
-        # Monitor process output
-        for line in process.stderr:
-            # Demucs outputs progress to stderr
-            if "%" in line:
-                # Try to extract percentage
-                try:
-                    parts = line.split("%")
-                    if len(parts) > 0:
-                        percent_str = parts[0].strip().split()[-1]
-                        percent = int(float(percent_str))
-                        emit({
-                            "type": "progress",
-                            "percent": percent,
-                            "message": f"Processing: {percent}%"
-                        })
-                except (ValueError, IndexError):
-                    pass
-
-        stdout, stderr = process.communicate()
-
-        if process.returncode != 0:
-            emit_error({
-                "type": "error",
-                "message": f"Demucs failed with exit code {process.returncode}",
-                "stderr": stderr
-            })
-            sys.exit(1)
-
-    except FileNotFoundError:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(progress):
+            demucs_main(demucs_args)
+    except SystemExit as e:
+        # Demucs reports bad input or an unknown model via sys.exit. As for
+        # the interpreter, None means success and any other non-int failure
+        if e.code is None:
+            exit_code = 0
+        else:
+            exit_code = e.code if isinstance(e.code, int) else 1
+    except Exception as e:
         emit_error({
             "type": "error",
-            "message": "Demucs not found. Please install: pip install demucs"
+            "message": f"Demucs execution failed: {str(e)}",
+            "stderr": progress.stderr_text()
         })
         sys.exit(1)
 
-    except Exception as e:
+    if exit_code != 0:
         emit_error({
             "type": "error",
-            "message": f"Demucs execution failed: {str(e)}"
+            "message": f"Demucs failed with exit code {exit_code}",
+            "stderr": progress.stderr_text()
         })
         sys.exit(1)
 
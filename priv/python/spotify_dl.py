@@ -14,26 +14,173 @@ Uses spotipy for metadata and yt-dlp for audio downloading directly.
 
 import sys
 import json
+import logging
 import os
 import re
 import argparse
+import functools
+import time
+import sqlite3
+import stat
 import tempfile
+import threading
+import concurrent.futures
 from pathlib import Path
 
+_SPOTIFY_URL_RE = re.compile(r"spotify\.com/(track|album|playlist)/([a-zA-Z0-9]+)")
+# The embed page's state is a JSON blob in <script id="__NEXT_DATA__">
+_NEXT_DATA_MARKER = b'id="__NEXT_DATA__"'
+
+
+# Optional orjson: faster encoding of results and decoding of embed pages
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# Optional selectolax: real HTML parse as a fallback for when the embed
+# page markup no longer matches the fast marker scan
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+
+def dumps(data):
+    """Serialise to UTF-8 JSON bytes."""
+    if HAS_ORJSON:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def loads(data):
+    """Parse JSON from str, bytes or a memoryview of bytes."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _write_line(stream, data):
+    stream.buffer.write(dumps(data) + b"\n")
+    stream.buffer.flush()
+
+
 # Flush stdout for Erlang Port communication
 def emit(data):
-    """Print JSON to stdout with explicit flush."""
-    print(json.dumps(data), flush=True)
+    """Write JSON to stdout with explicit flush."""
+    _write_line(sys.stdout, data)
 
 
 def emit_error(data):
-    """Print JSON error to stderr with explicit flush."""
-    print(json.dumps(data), file=sys.stderr, flush=True)
+    """Write JSON error to stderr with explicit flush."""
+    _write_line(sys.stderr, data)
+
+
+_SESSION = None
+
+
+def get_session():
+    """Shared requests session: keep-alive pooling plus retries on 502/503.
+
+    Used for the embed pages and handed to spotipy, so every request to
+    Spotify reuses the same pooled TLS connections.
+    """
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # 429 is left to spotify_call, which honours Retry-After up to a cap;
+        # retried here, spotipy would only see a header-less RetryError. The
+        # header is ignored too, or urllib3 would still sleep on a 429 for it
+        retry = Retry(
+            total=3, backoff_factor=0.3, status_forcelist=[502, 503],
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        _SESSION = requests.Session()
+        _SESSION.mount("http://", adapter)
+        _SESSION.mount("https://", adapter)
+        _SESSION.headers["User-Agent"] = "Mozilla/5.0"
+    return _SESSION
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` acquisitions per second, ``burst`` at once."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping only as long as the bucket is empty."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Spotify Web API calls share one budget across the enrichment workers
+_SPOTIFY_RATE = TokenBucket(rate=10, burst=10)
+SPOTIFY_429_RETRIES = 3
+# Longer Retry-After values mean the app is throttled for minutes or hours;
+# fail (the embed data still works) rather than block the Port
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+def spotify_call(fn, *args, **kwargs):
+    """Call a spotipy method under the rate limit, retrying 429s per Retry-After."""
+    from spotipy import SpotifyException
+
+    for attempt in range(SPOTIFY_429_RETRIES + 1):
+        _SPOTIFY_RATE.acquire()
+        try:
+            return fn(*args, **kwargs)
+        except SpotifyException as e:
+            if e.http_status != 429 or attempt == SPOTIFY_429_RETRIES:
+                raise
+            retry_after = (e.headers or {}).get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+            if delay > MAX_RETRY_AFTER_SECONDS:
+                raise
+            time.sleep(delay)
+
+
+_SP_CLIENT = None
+
+
+def _cache_dir():
+    """Per-user cache directory: $XDG_CACHE_HOME/sfa (~/.cache by default)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "sfa")
 
 
 def get_spotify_client():
-    """Create authenticated Spotify client using environment variables."""
+    """Create authenticated Spotify client using environment variables.
+
+    The client is built once per process, and its client-credentials token
+    is cached on disk (per client ID) so later invocations within the
+    token's hour-long lifetime skip the OAuth round trip.
+    """
+    global _SP_CLIENT
+    if _SP_CLIENT is not None:
+        return _SP_CLIENT
+
     import spotipy
+    from spotipy.cache_handler import CacheFileHandler, MemoryCacheHandler
     from spotipy.oauth2 import SpotifyClientCredentials
 
     client_id = os.environ.get("SPOTIPY_CLIENT_ID", "")
@@ -44,17 +191,39 @@ def get_spotify_client():
             "SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET must be set"
         )
 
-    return spotipy.Spotify(
-        auth_manager=SpotifyClientCredentials(
-            client_id=client_id, client_secret=client_secret
+    # spotipy logs cache failures through the root logger's stderr fallback;
+    # the Port merges stderr into stdout, so any stray line breaks the JSON
+    logging.getLogger("spotipy").addHandler(logging.NullHandler())
+
+    cache_dir = _cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        writable = os.access(cache_dir, os.W_OK)
+    except OSError:
+        writable = False
+    if writable:
+        cache_handler = CacheFileHandler(
+            cache_path=os.path.join(cache_dir, f"spotify_token_{client_id}.json")
         )
+    else:
+        # e.g. the release image's nobody user, whose HOME is /nonexistent
+        cache_handler = MemoryCacheHandler()
+
+    session = get_session()
+    _SP_CLIENT = spotipy.Spotify(
+        auth_manager=SpotifyClientCredentials(
+            client_id=client_id, client_secret=client_secret,
+            cache_handler=cache_handler,
+            requests_session=session
+        ),
+        requests_session=session
     )
+    return _SP_CLIENT
 
 
 def extract_spotify_info(url):
     """Extract type and ID from a Spotify URL."""
-    pattern = r"spotify\.com/(track|album|playlist)/([a-zA-Z0-9]+)"
-    match = re.search(pattern, url)
+    match = _SPOTIFY_URL_RE.search(url)
     if not match:
         return None, None
     return match.group(1), match.group(2)
@@ -62,7 +231,7 @@ def extract_spotify_info(url):
 
 def fetch_track_metadata(sp, track_id):
     """Fetch metadata for a single track."""
-    track = sp.track(track_id)
+    track = spotify_call(sp.track, track_id)
     return {
         "name": track["name"],
         "artists": [a["name"] for a in track["artists"]],
@@ -78,45 +247,164 @@ def fetch_track_metadata(sp, track_id):
     }
 
 
+# /v1/albums/{id}/tracks pages hold at most 50 tracks
+ALBUM_TRACKS_PAGE_SIZE = 50
+
+
+def _album_track_items(sp, album_id, album):
+    """All track items of ``album``, fetching pages past the embedded first one.
+
+    sp.album() embeds only the first page of tracks; the remaining pages are
+    fetched concurrently by offset and returned in album order.
+    """
+    first_page = album["tracks"]
+    items = list(first_page["items"])
+    total = first_page.get("total", len(items))
+    offsets = range(len(items), total, ALBUM_TRACKS_PAGE_SIZE)
+    if not offsets:
+        return items
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS) as executor:
+        pages = executor.map(
+            lambda offset: spotify_call(
+                sp.album_tracks, album_id, limit=ALBUM_TRACKS_PAGE_SIZE, offset=offset
+            ),
+            offsets,
+        )
+        for page in pages:
+            items.extend(page["items"])
+    return items
+
+
 def fetch_album_metadata(sp, album_id):
     """Fetch metadata for all tracks in an album."""
-    album = sp.album(album_id)
-    tracks = []
-    for item in album["tracks"]["items"]:
-        tracks.append({
+    album = spotify_call(sp.album, album_id)
+    # Album-level fields are the same for every track
+    album_name = album["name"]
+    album_artist = album["artists"][0]["name"] if album["artists"] else ""
+    cover_url = album["images"][0]["url"] if album["images"] else ""
+    return [
+        {
             "name": item["name"],
             "artists": [a["name"] for a in item["artists"]],
-            "album_name": album["name"],
-            "album_artist": album["artists"][0]["name"] if album["artists"] else "",
+            "album_name": album_name,
+            "album_artist": album_artist,
             "duration": item["duration_ms"] / 1000,
             "song_id": item["id"],
-            "cover_url": album["images"][0]["url"] if album["images"] else "",
+            "cover_url": cover_url,
             "url": item["external_urls"]["spotify"],
             "disc_number": item.get("disc_number", 1),
             "track_number": item.get("track_number", 1),
-        })
-    return tracks
+        }
+        for item in _album_track_items(sp, album_id, album)
+    ]
+
+
+def _next_data_blob(html):
+    """View of the JSON in the page's __NEXT_DATA__ script tag, or None.
+
+    Plain substring scans over the raw bytes: no regex backtracking across
+    the page, and no decode of the HTML that is thrown away.
+    """
+    start = html.find(_NEXT_DATA_MARKER)
+    if start < 0:
+        return None
+    start = html.find(b">", start) + 1
+    end = html.find(b"</script>", start) if start > 0 else -1
+    if end < 0:
+        return None
+    # A view, not a copy: orjson parses straight out of the page buffer
+    return memoryview(html)[start:end]
+
+
+EMBED_CHUNK_SIZE = 65536
+
+
+def _read_next_data(resp):
+    """Read a streamed embed page up to the end of its __NEXT_DATA__ blob.
+
+    The page is scanned as it arrives, so it is never held as both bytes
+    and decoded text. The blob sits at the end of the page; the remaining
+    tail is read and dropped so the connection goes back to the pool. When
+    the marker scan fails and selectolax is installed, the page is parsed
+    as HTML to locate the script tag (quoting or markup changes).
+    """
+    buf = bytearray()
+    blob = None
+    chunks = resp.iter_content(chunk_size=EMBED_CHUNK_SIZE)
+    for chunk in chunks:
+        seen = len(buf)
+        buf += chunk
+        # Only a newly arrived </script> can complete the blob
+        if buf.find(b"</script>", max(0, seen - 8)) >= 0:
+            blob = _next_data_blob(buf)
+            if blob is not None:
+                break
+    for _ in chunks:
+        pass
+    if blob is None and HAS_SELECTOLAX:
+        # Whole page is in buf; let an HTML5 tokenizer find the tag
+        node = LexborHTMLParser(bytes(buf)).css_first("script#__NEXT_DATA__")
+        if node is not None:
+            blob = node.text()
+    return blob
+
+
+def _cached_embed(cache_base):
+    """(etag, blob) cached for an embed page, or (None, None)."""
+    try:
+        with open(cache_base + ".etag") as f:
+            etag = f.read().strip()
+        with open(cache_base + ".json", "rb") as f:
+            return etag, f.read()
+    except OSError:
+        return None, None
+
+
+def _store_embed(cache_base, etag, blob):
+    """Cache an embed page's __NEXT_DATA__ blob under its ETag (best effort)."""
+    data = blob.encode() if isinstance(blob, str) else bytes(blob)
+    try:
+        os.makedirs(os.path.dirname(cache_base), exist_ok=True)
+        # Blob before ETag, each replaced atomically, so a reader never pairs
+        # a new ETag with an old blob
+        for suffix, payload in ((".json", data), (".etag", etag.encode())):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_base), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, cache_base + suffix)
+    except OSError:
+        pass
 
 
 def _parse_embed_page(content_type, content_id):
     """Fetch and parse the Spotify embed page __NEXT_DATA__ JSON.
 
-    Works without any API credentials for public content.
-    Returns the ``entity`` dict from the embed page state.
+    Works without any API credentials for public content. The blob is
+    cached under the page's ETag ($XDG_CACHE_HOME/sfa/embed) and the page is
+    revalidated with If-None-Match, so an unchanged page is not downloaded
+    again. Returns the ``entity`` dict from the embed page state.
     """
-    import requests
-
     embed_url = f"https://open.spotify.com/embed/{content_type}/{content_id}"
-    resp = requests.get(embed_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
-    resp.raise_for_status()
-
-    match = re.search(
-        r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', resp.text
-    )
-    if not match:
+    cache_base = os.path.join(_cache_dir(), "embed", f"{content_type}_{content_id}")
+    cached_etag, cached_blob = _cached_embed(cache_base)
+    # Conditional GET: an unchanged page comes back as a bodiless 304
+    headers = {"If-None-Match": cached_etag} if cached_etag else None
+
+    etag = None
+    with get_session().get(embed_url, timeout=15, stream=True, headers=headers) as resp:
+        if resp.status_code == 304 and cached_etag:
+            blob = cached_blob
+        else:
+            resp.raise_for_status()
+            blob = _read_next_data(resp)
+            etag = resp.headers.get("ETag")
+    if blob is None:
         raise ValueError(f"Could not parse {content_type} embed page for {content_id}")
+    if etag:
+        _store_embed(cache_base, etag, blob)
 
-    embed_data = json.loads(match.group(1))
+    embed_data = loads(blob)
     return embed_data["props"]["pageProps"]["state"]["data"]["entity"]
 
 
@@ -131,6 +419,15 @@ def _embed_duration_seconds(raw):
     return (raw or 0) / 1000
 
 
+def _split_artists(subtitle):
+    """Artist names from an embed ``subtitle`` ("A, B, C").
+
+    Names are interned: playlists and albums repeat the same few artists
+    across many tracks, so every track shares one string per artist.
+    """
+    return [sys.intern(a) for a in map(str.strip, subtitle.split(",")) if a]
+
+
 def fetch_track_metadata_no_creds(track_id):
     """Fetch metadata for a single track via embed page (no API credentials)."""
     entity = _parse_embed_page("track", track_id)
@@ -139,8 +436,7 @@ def fetch_track_metadata_no_creds(track_id):
     if entity.get("coverArt", {}).get("sources"):
         cover_url = entity["coverArt"]["sources"][0].get("url", "")
 
-    artists_str = entity.get("subtitle", "")
-    artists = [a.strip() for a in artists_str.split(",") if a.strip()]
+    artists = _split_artists(entity.get("subtitle", ""))
 
     album_name = ""
     if entity.get("albumOfTrack"):
@@ -181,8 +477,7 @@ def fetch_album_metadata_no_creds(album_id):
             continue
         tid = uri.split(":")[-1]
 
-        artists_str = item.get("subtitle", "")
-        artists = [a.strip() for a in artists_str.split(",") if a.strip()]
+        artists = _split_artists(item.get("subtitle", ""))
 
         track_cover = cover_url
         if item.get("coverArt", {}).get("sources"):
@@ -207,6 +502,133 @@ def fetch_album_metadata_no_creds(album_id):
     return tracks
 
 
+# /v1/tracks accepts at most 50 IDs per request
+TRACKS_BATCH_SIZE = 50
+ENRICHMENT_WORKERS = 4
+
+
+def _album_enrichment(track):
+    """Album fields used to enrich an embed-page track."""
+    album_images = track["album"].get("images", [])
+    return {
+        "album_name": track["album"]["name"],
+        "album_artist": (
+            track["album"]["artists"][0]["name"]
+            if track["album"].get("artists") else ""
+        ),
+        "isrc": track.get("external_ids", {}).get("isrc", ""),
+        "cover_url": album_images[0]["url"] if album_images else "",
+    }
+
+
+# Album data for a track ID does not change, so enrichment is cached on disk
+TRACK_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+
+def _open_track_cache():
+    """Open the enrichment cache, or return None when it cannot be created."""
+    try:
+        os.makedirs(_cache_dir(), exist_ok=True)
+        db = sqlite3.connect(os.path.join(_cache_dir(), "track_cache.sqlite"))
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS enrichment "
+            "(track_id TEXT PRIMARY KEY, json BLOB NOT NULL, fetched_at INTEGER NOT NULL)"
+        )
+        return db
+    except (OSError, sqlite3.Error) as e:
+        emit_error({"warning": "track_cache_disabled", "error": str(e)})
+        return None
+
+
+def _cached_enrichment(db, track_ids):
+    """Return {track_id: enrichment} for cached entries younger than the TTL."""
+    cutoff = int(time.time()) - TRACK_CACHE_TTL_SECONDS
+    found = {}
+    try:
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(track_ids), 500):
+            chunk = track_ids[i:i + 500]
+            rows = db.execute(
+                f"SELECT track_id, json FROM enrichment WHERE fetched_at >= ? "
+                f"AND track_id IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk],
+            )
+            found.update((tid, loads(blob)) for tid, blob in rows)
+    except (sqlite3.Error, ValueError) as e:
+        emit_error({"warning": "track_cache_read_failed", "error": str(e)})
+    return found
+
+
+def _store_enrichment(db, album_map):
+    now = int(time.time())
+    try:
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO enrichment VALUES (?, ?, ?)",
+                [(tid, dumps(info), now) for tid, info in album_map.items()],
+            )
+    except sqlite3.Error as e:
+        emit_error({"warning": "track_cache_write_failed", "error": str(e)})
+    finally:
+        db.close()
+
+
+def _fetch_album_enrichment(sp, track_ids):
+    """Fetch album data for ``track_ids`` via batched /v1/tracks calls.
+
+    Tracks enriched within TRACK_CACHE_TTL_SECONDS are served from the
+    on-disk cache; the rest are fetched in batches of TRACKS_BATCH_SIZE,
+    run concurrently. Some client-credentials
+    apps get 403 from the batch endpoint; those batches fall back to one
+    sp.track() call per ID. Returns {track_id: enrichment dict}; failures
+    are reported as warnings and leave the track unenriched.
+    """
+    from spotipy import SpotifyException
+
+    def fetch_batch(batch):
+        try:
+            return spotify_call(sp.tracks, batch)["tracks"]
+        except SpotifyException as e:
+            if e.http_status != 403:
+                raise
+        found = []
+        for tid in batch:
+            try:
+                found.append(spotify_call(sp.track, tid))
+            except Exception as e:
+                emit_error({"warning": "enrichment_failed", "track_id": tid, "error": str(e)})
+        return found
+
+    # track_id -> {"album_name": ..., "album_artist": ..., "isrc": ..., "cover_url": ...}
+    db = _open_track_cache()
+    album_map = _cached_enrichment(db, track_ids) if db is not None else {}
+    missing = [tid for tid in track_ids if tid not in album_map]
+
+    batches = [
+        missing[i:i + TRACKS_BATCH_SIZE]
+        for i in range(0, len(missing), TRACKS_BATCH_SIZE)
+    ]
+    fetched = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=ENRICHMENT_WORKERS) as executor:
+        futures = {executor.submit(fetch_batch, batch): batch for batch in batches}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                found = future.result()
+            except Exception as e:
+                for tid in futures[future]:
+                    emit_error({"warning": "enrichment_failed", "track_id": tid, "error": str(e)})
+                continue
+            for t in found:
+                # Unknown IDs come back as null entries
+                if t and t.get("album"):
+                    fetched[t["id"]] = _album_enrichment(t)
+
+    if db is not None:
+        _store_enrichment(db, fetched)
+    album_map.update(fetched)
+    return album_map
+
+
 def fetch_playlist_metadata(sp, playlist_id):
     """Fetch metadata for all tracks in a playlist.
 
@@ -214,25 +636,17 @@ def fetch_playlist_metadata(sp, playlist_id):
     playlist_items endpoint returns 403 with client credentials flow.
     The embed data provides all fields needed for the pipeline.
 
-    Falls back to individual sp.track() calls for enrichment when possible,
-    but works fully from embed data alone if the API is restricted.
+    Enriches tracks with album data from batched sp.tracks() calls when
+    possible, but works fully from embed data alone if the API is restricted.
     If ``sp`` is None, skips API enrichment entirely.
     """
-    import requests
-
-    # Get track list from embed page (no auth required for public playlists)
-    embed_url = f"https://open.spotify.com/embed/playlist/{playlist_id}"
-    resp = requests.get(embed_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=15)
-    resp.raise_for_status()
-
-    match = re.search(
-        r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', resp.text
-    )
-    if not match:
-        raise ValueError("Could not parse playlist embed page")
-
-    embed_data = json.loads(match.group(1))
-    entity = embed_data["props"]["pageProps"]["state"]["data"]["entity"]
+    # Get track list from embed page (no auth required for public playlists).
+    # Meanwhile obtain the API token so enrichment does not start with an
+    # OAuth round trip; a failure there surfaces in the enrichment warnings.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        if sp is not None:
+            executor.submit(sp.auth_manager.get_access_token, as_dict=False)
+        entity = _parse_embed_page("playlist", playlist_id)
     track_list = entity.get("trackList", [])
     playlist_cover = ""
     if entity.get("coverArt", {}).get("sources"):
@@ -258,55 +672,37 @@ def fetch_playlist_metadata(sp, playlist_id):
         track_ids.append(tid)
         embed_tracks.append((i, item, tid))
 
-    # Enrich tracks with album data from Spotify API (individual calls).
-    # Skipped when sp is None (no-credentials mode) -- embed data used as-is.
-    # The embed page doesn't include album names; sp.tracks() batch
-    # endpoint returns 403 with client credentials, so use sp.track()
-    album_map = {}  # track_id -> {"album_name": ..., "album_artist": ..., "isrc": ...}
-    if sp is not None:
-        import time
-        for tid in track_ids:
-            try:
-                t = sp.track(tid)
-                if t and t.get("album"):
-                    album_images = t["album"].get("images", [])
-                    album_map[tid] = {
-                        "album_name": t["album"]["name"],
-                        "album_artist": (
-                            t["album"]["artists"][0]["name"]
-                            if t["album"].get("artists") else ""
-                        ),
-                        "isrc": t.get("external_ids", {}).get("isrc", ""),
-                        "cover_url": album_images[0]["url"] if album_images else "",
-                    }
-                time.sleep(0.05)  # Rate limit courtesy
-            except Exception as e:
-                emit_error({"warning": "enrichment_failed", "track_id": tid, "error": str(e)})
+    # Enrich tracks with album data from Spotify API (the embed page doesn't
+    # include album names). Skipped when sp is None (no-credentials mode) --
+    # embed data used as-is.
+    album_map = _fetch_album_enrichment(sp, track_ids) if sp is not None else {}
 
+    no_enrichment = {}
     tracks = []
+    append = tracks.append
     for i, item, tid in embed_tracks:
-        artists_str = item.get("subtitle", "")
+        artists = _split_artists(item.get("subtitle", ""))
 
         # Extract per-track cover art; never default to playlist cover
         track_cover = ""
-        if item.get("coverArt", {}).get("sources"):
-            embed_cover = item["coverArt"]["sources"][0].get("url", "")
+        sources = item.get("coverArt", {}).get("sources")
+        if sources:
+            embed_cover = sources[0].get("url", "")
             # Only use embed cover if it differs from the playlist mosaic
             if embed_cover and embed_cover != playlist_cover:
                 track_cover = embed_cover
 
         # Use enriched data from API if available, else fall back to embed data
-        enriched = album_map.get(tid, {})
+        enriched = album_map.get(tid, no_enrichment)
 
-        tracks.append({
+        append({
             "name": item.get("title", ""),
-            "artists": [a.strip() for a in artists_str.split(",") if a.strip()],
+            "artists": artists,
             "album_name": enriched.get("album_name", ""),
-            "album_artist": enriched.get("album_artist", "")
-                or (artists_str.split(",")[0].strip() if artists_str else ""),
-            "duration": item.get("duration", 0) / 1000,
+            "album_artist": enriched.get("album_artist", "") or (artists[0] if artists else ""),
+            "duration": _embed_duration_seconds(item.get("duration", 0)),
             "song_id": tid,
-            "cover_url": enriched.get("cover_url") or track_cover or "",
+            "cover_url": enriched.get("cover_url") or track_cover,
             "url": f"https://open.spotify.com/track/{tid}",
             "track_number": i + 1,
             "disc_number": 1,
@@ -367,24 +763,61 @@ def cmd_metadata_no_creds(args):
         sys.exit(1)
 
 
-def search_youtube(query, duration_hint=None):
-    """Search YouTube for best audio match using yt-dlp."""
-    import yt_dlp
+class DownloadError(Exception):
+    """A search or download step failed; the message is reported as the error."""
 
-    search_query = f"ytsearch5:{query}"
-    ydl_opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "extract_flat": True,
-    }
 
+_YDL_LOCAL = threading.local()
+
+
+def _search_ydl():
+    """This thread's YoutubeDL for searches, built on first use and reused.
+
+    Search options never vary, so one instance serves every search on the
+    thread instead of being set up and torn down per track. YoutubeDL is
+    not thread-safe, hence one per download-batch worker.
+    """
+    ydl = getattr(_YDL_LOCAL, "search", None)
+    if ydl is None:
+        import yt_dlp
+
+        ydl = _YDL_LOCAL.search = yt_dlp.YoutubeDL({
+            "quiet": True,
+            "no_warnings": True,
+            # Flat entries carry url and duration; no per-video page fetches
+            "extract_flat": "in_playlist",
+            "noplaylist": True,
+            "skip_download": True,
+            "socket_timeout": 10,
+        })
+    return ydl
+
+
+def search_youtube(query, duration_hint=None):
+    """Search YouTube for best audio match using yt-dlp.
+
+    Returns the URL, or None when nothing matched or the search failed.
+    """
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(search_query, download=False)
+        return _search_youtube_cached(query, duration_hint)
     except Exception as e:
         emit_error({"error": f"YouTube search failed: {e}"})
         return None
 
+
+@functools.lru_cache(maxsize=256)
+def _search_youtube_cached(query, duration_hint):
+    """search_youtube's lookup, memoised per (query, duration_hint) for batch runs.
+
+    Only a duration hint can pick a later result, so without one a single
+    result is requested. Misses are cached; failures raise, and lru_cache
+    does not cache an exception, so a transient error is retried next time.
+    """
+    n_results = 3 if duration_hint else 1
+    search_query = f"ytsearch{n_results}:{query}"
+
+    info = _search_ydl().extract_info(search_query, download=False)
+
     if not info or "entries" not in info:
         return None
 
@@ -405,10 +838,61 @@ def search_youtube(query, duration_hint=None):
     return best.get("url") or best.get("webpage_url")
 
 
+def _find_output_file(output_dir, output_template):
+    """First finished file named ``<output_template>.<ext>`` in output_dir, or None."""
+    prefix = output_template + "."
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if (name.startswith(prefix) and not name.endswith((".part", ".ytdl"))
+                    and entry.is_file()):
+                return entry.path
+    return None
+
+
+# yt-dlp format selectors for sources that already use a target codec.
+# YouTube serves no MP3, so --format mp3 always needs an encode.
+_SOURCE_FORMAT_FOR_CODEC = {
+    "opus": "bestaudio[acodec=opus]",
+    "vorbis": "bestaudio[acodec=vorbis]",
+    "m4a": "bestaudio[ext=m4a]",
+    "aac": "bestaudio[acodec^=mp4a]",
+}
+
+
+def _default_output_dir(output_template):
+    """Download dir when --output-dir is not given.
+
+    A stable per-user directory under the system temp dir, so repeated runs
+    do not leave an empty mkdtemp directory behind each; a unique subdir is
+    only made when a file for ``output_template`` is already there.
+
+    The name is predictable, so an existing path is only reused when it is
+    a real directory (not a symlink) owned by us with mode 0700; anything
+    else another local user could have planted, and mkdtemp is used instead.
+    """
+    if not hasattr(os, "getuid"):
+        return tempfile.mkdtemp(prefix="sfa_dl_")
+    base = os.path.join(tempfile.gettempdir(), f"sfa_dl_{os.getuid()}")
+    try:
+        os.mkdir(base, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return tempfile.mkdtemp(prefix="sfa_dl_")
+    st = os.lstat(base)
+    if not (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid()
+            and stat.S_IMODE(st.st_mode) == 0o700):
+        return tempfile.mkdtemp(prefix="sfa_dl_")
+    if _find_output_file(base, output_template) is None:
+        return base
+    return tempfile.mkdtemp(prefix="sfa_dl_", dir=base)
+
+
 def _download_from_youtube(query, duration_hint, args, output_template_default):
     """Shared download logic: search YouTube then download via yt-dlp.
 
-    Returns (output_path, file_size) on success, calls sys.exit(1) on failure.
+    Returns (output_path, file_size); raises DownloadError on failure.
     """
     import yt_dlp
 
@@ -417,13 +901,15 @@ def _download_from_youtube(query, duration_hint, args, output_template_default):
     yt_url = search_youtube(query, duration_hint=duration_hint)
 
     if not yt_url:
-        emit_error({"error": f"No YouTube results for: {query}"})
-        sys.exit(1)
+        raise DownloadError(f"No YouTube results for: {query}")
 
     emit_error({"status": "downloading", "youtube_url": yt_url})
 
-    output_dir = os.path.abspath(args.output_dir) if args.output_dir else tempfile.mkdtemp(prefix="sfa_dl_")
     output_template = args.output_template or output_template_default
+    output_dir = (
+        os.path.abspath(args.output_dir) if args.output_dir
+        else _default_output_dir(output_template)
+    )
     audio_format = args.format or "mp3"
     bitrate = args.bitrate or "320k"
 
@@ -431,8 +917,11 @@ def _download_from_youtube(query, duration_hint, args, output_template_default):
 
     output_path = os.path.join(output_dir, f"{output_template}.{audio_format}")
 
+    # Prefer a source already in the target codec: FFmpegExtractAudio then
+    # copies the stream instead of re-encoding it
+    source_pref = _SOURCE_FORMAT_FOR_CODEC.get(audio_format)
     ydl_opts = {
-        "format": "bestaudio/best",
+        "format": f"{source_pref}/bestaudio/best" if source_pref else "bestaudio/best",
         "outtmpl": os.path.join(output_dir, f"{output_template}.%(ext)s"),
         "postprocessors": [
             {
@@ -449,37 +938,34 @@ def _download_from_youtube(query, duration_hint, args, output_template_default):
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([yt_url])
     except Exception as e:
-        emit_error({"error": f"yt-dlp download failed: {e}"})
-        sys.exit(1)
+        raise DownloadError(f"yt-dlp download failed: {e}")
 
     if os.path.exists(output_path):
         file_size = os.path.getsize(output_path)
     else:
-        pattern = os.path.join(output_dir, f"{output_template}.*")
-        import glob
-        matches = glob.glob(pattern)
-        if matches:
-            output_path = matches[0]
-            file_size = os.path.getsize(output_path)
-        else:
-            emit_error({"error": "Downloaded file not found"})
-            sys.exit(1)
+        # The codec may have produced another extension; a plain prefix test
+        # also copes with templates containing glob metacharacters
+        output_path = _find_output_file(output_dir, output_template)
+        if output_path is None:
+            raise DownloadError("Downloaded file not found")
+        file_size = os.path.getsize(output_path)
 
     return output_path, file_size
 
 
-def cmd_download(args):
-    """Download audio from a Spotify URL via YouTube."""
-    sp = get_spotify_client()
-    item_type, item_id = extract_spotify_info(args.url)
+def _download_track(sp, url, args):
+    """Resolve a Spotify track URL and download its audio via YouTube.
+
+    Returns (output_path, file_size, metadata); raises DownloadError when the
+    URL is not a track or no audio could be downloaded.
+    """
+    item_type, item_id = extract_spotify_info(url)
 
     if not item_type:
-        emit_error({"error": "Invalid Spotify URL"})
-        sys.exit(1)
+        raise DownloadError("Invalid Spotify URL")
 
     if item_type != "track":
-        emit_error({"error": "Download only supports single tracks"})
-        sys.exit(1)
+        raise DownloadError("Download only supports single tracks")
 
     meta = fetch_track_metadata(sp, item_id)
     artist_str = ", ".join(meta["artists"])
@@ -488,10 +974,45 @@ def cmd_download(args):
     output_path, file_size = _download_from_youtube(
         search_query, meta.get("duration"), args, meta["song_id"]
     )
+    return output_path, file_size, meta
+
+
+def cmd_download(args):
+    """Download audio from a Spotify URL via YouTube."""
+    sp = get_spotify_client()
+    try:
+        output_path, file_size, meta = _download_track(sp, args.url, args)
+    except DownloadError as e:
+        emit_error({"error": str(e)})
+        sys.exit(1)
 
     emit({"path": output_path, "size": file_size, "metadata": meta})
 
 
+def cmd_download_batch(args):
+    """Download several Spotify track URLs concurrently.
+
+    Each track's metadata lookup, search and download runs on a worker
+    thread, so one track's network I/O overlaps another's FFmpeg encode.
+    Emits one JSON line per URL as it finishes (not in input order), with
+    either the download result or an error; exits 1 if any failed.
+    """
+    sp = get_spotify_client()
+    failed = False
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {executor.submit(_download_track, sp, url, args): url for url in args.urls}
+        for future in concurrent.futures.as_completed(futures):
+            url = futures[future]
+            try:
+                output_path, file_size, meta = future.result()
+            except Exception as e:
+                failed = True
+                emit({"url": url, "error": str(e)})
+                continue
+            emit({"url": url, "path": output_path, "size": file_size, "metadata": meta})
+    sys.exit(1 if failed else 0)
+
+
 def cmd_download_direct(args):
     """Download audio by searching YouTube directly with provided metadata.
 
@@ -500,9 +1021,13 @@ def cmd_download_direct(args):
     search_query = f"{args.title} {args.artist}"
     duration_hint = float(args.duration) if args.duration else None
 
-    output_path, file_size = _download_from_youtube(
-        search_query, duration_hint, args, args.output_template or "direct"
-    )
+    try:
+        output_path, file_size = _download_from_youtube(
+            search_query, duration_hint, args, args.output_template or "direct"
+        )
+    except DownloadError as e:
+        emit_error({"error": str(e)})
+        sys.exit(1)
 
     emit({"path": output_path, "size": file_size})
 
@@ -530,6 +1055,17 @@ def main():
     dl_parser.add_argument("--format", default="mp3", help="Audio format (default: mp3)")
     dl_parser.add_argument("--bitrate", default="320k", help="Audio bitrate (default: 320k)")
 
+    # download-batch command: several track URLs, downloaded concurrently
+    db_parser = subparsers.add_parser(
+        "download-batch",
+        help="Download audio for several Spotify track URLs concurrently",
+    )
+    db_parser.add_argument("urls", nargs="+", help="Spotify track URLs")
+    db_parser.add_argument("--jobs", type=int, default=4, help="Concurrent downloads (default: 4)")
+    db_parser.add_argument("--output-dir", help="Output directory")
+    db_parser.add_argument("--format", default="mp3", help="Audio format (default: mp3)")
+    db_parser.add_argument("--bitrate", default="320k", help="Audio bitrate (default: 320k)")
+
     # download-direct command (no Spotify API -- uses provided metadata)
     dd_parser = subparsers.add_parser(
         "download-direct",
@@ -551,6 +1087,12 @@ def main():
         cmd_metadata_no_creds(args)
     elif args.command == "download":
         cmd_download(args)
+    elif args.command == "download-batch":
+        if args.jobs < 1:
+            db_parser.error("--jobs must be a positive integer")
+        # Files are named by track ID; a shared template would collide
+        args.output_template = None
+        cmd_download_batch(args)
     elif args.command == "download-direct":
         cmd_download_direct(args)
 
@@ -0,0 +1,54 @@
+"""Regression tests for priv/python/analyzer.py (run with pytest)."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "priv", "python"))
+
+import analyzer  # noqa: E402
+
+SR = 22050
+
+
+@pytest.fixture(scope="module")
+def tone():
+    t = np.arange(10 * SR) / SR
+    y = (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    return y, analyzer.compute_loop_features(y, SR)
+
+
+def test_loop_candidates_past_track_end_score_zero(tone):
+    y, feats = tone
+    duration = len(y) / SR
+    # compute_bar_grid extrapolates a bar past the last beat, so window
+    # ends (and starts) can land well after the end of the track
+    starts = np.array([2.0, 4.0, duration - 2.0])
+    ends = np.array([4.0, duration + 0.75, duration + 2.0])
+    scores = analyzer.score_loop_candidates(y, SR, starts, ends, feats)
+    assert scores.shape == (3,)
+    assert scores[0] > 0.9
+    assert scores[1] == 0.0
+    assert scores[2] == 0.0
+
+
+def test_compute_loop_quality_matches_batch(tone):
+    y, feats = tone
+    batch = analyzer.score_loop_candidates(y, SR, np.array([2.0]), np.array([6.0]), feats)
+    assert analyzer.compute_loop_quality(y, SR, 2.0, 6.0, feats=feats) == pytest.approx(batch[0])
+
+
+
+@pytest.mark.parametrize("cents", [-30, 20, 43])
+def test_shared_tuning_chroma_cqt_matches_librosa(tmp_path, cents):
+    # A detuned A4: analyze_audio estimates tuning once and shares it, and
+    # chroma_cqt must still match librosa estimating it inside chroma_cqt
+    sf = pytest.importorskip("soundfile")
+    t = np.arange(5 * SR) / SR
+    y = (0.5 * np.sin(2 * np.pi * 440.0 * 2 ** (cents / 1200) * t)).astype(np.float32)
+    path = tmp_path / "tone.wav"
+    sf.write(path, y, SR, subtype="FLOAT")
+    results = analyzer.analyze_audio(str(path), ["chroma:stft+cqt"], sample_rate=SR, stream=False)
+    expected = analyzer.librosa.feature.chroma_cqt(y=y, sr=SR).mean(axis=1)
+    np.testing.assert_allclose(results["chroma_cqt"], expected, atol=1e-4)